@@ -0,0 +1,75 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Beam search over the candidates of a sentence.
+
+Correcting word by word commits to the best candidate of each word given
+the correction of the previous one, even when a slightly worse candidate
+would make the next word much more probable. The lattice of the candidates
+of all the words is searched instead for the path with the highest product
+of the scores of its candidates, each one scored given the candidate before
+it on the path. Since the score only depends on the previous word, of the
+paths ending with the same word only the best one is kept; of the others,
+only the best 'width' ones are extended to the next position. Width 1 is
+word-by-word correction, a width larger than the number of candidates of
+every word finds the best path (Viterbi).
+
+"""
+
+import collections
+
+
+def decode(positions, log_scores, width, word_prev=None, stats=None):
+    """Return the best path found through the lattice.
+
+    positions (list): the candidates of each position, in the form
+        [w_prev, w, w_next, channel model probability].
+    log_scores (function): given the previous word (None for none) and the
+        candidates of a position, return their log-probabilities.
+    width (int): the number of paths kept at each position.
+    word_prev (string|None): the word before the first position.
+    stats (Counter): if given, the number of candidates ('lattice_nodes'),
+        of pairs of candidates of adjacent positions ('lattice_edges') and
+        of candidates actually scored ('beam_expansions') are added to it.
+
+    return (list): the candidate chosen for each position.
+
+    """
+    # The paths kept, as (log-probability, candidates) pairs by last word.
+    paths = collections.OrderedDict([(word_prev, (0.0, []))])
+    for idx, extended_candidates in enumerate(positions):
+        if stats is not None:
+            stats['lattice_nodes'] += len(extended_candidates)
+            if idx > 0:
+                stats['lattice_edges'] += len(positions[idx - 1]) * \
+                    len(extended_candidates)
+        extended = collections.OrderedDict()
+        for w_prev, (log_p, path) in paths.items():
+            candidate_log_ps = log_scores(w_prev, extended_candidates)
+            for candidate, w_log_p in zip(extended_candidates,
+                                          candidate_log_ps):
+                w_log_p += log_p
+                w = candidate[1]
+                if w not in extended or w_log_p > extended[w][0]:
+                    extended[w] = (w_log_p, path + [candidate])
+            if stats is not None:
+                stats['beam_expansions'] += len(extended_candidates)
+        best = sorted(extended.items(), key=lambda item: -item[1][0])
+        paths = collections.OrderedDict(best[:width])
+    return max(paths.values(), key=lambda item: item[0])[1]
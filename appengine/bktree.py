@@ -0,0 +1,203 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Candidate generation with a BK-tree (Burkhard-Keller metric tree).
+
+Each node holds a word; its children are labelled with their distance from
+it. By the triangle inequality, a search within distance k from a node at
+distance d only has to descend into the children labelled d - k ... d + k, so
+the cost of a lookup depends on the structure of the vocabulary rather than
+on the length of the query and the size of the alphabet.
+
+The tree can be built at instance start or loaded from a file written by
+this script, which is much faster:
+
+    ./bktree.py -f words -o words.bktree
+
+"""
+
+import argparse
+import codecs
+import sys
+
+from edits import damerau_levenshtein, group
+
+
+class BKTree(object):
+    """Candidate generator backed by a BK-tree over the dictionary.
+
+    Distances are (unrestricted) Damerau-Levenshtein distances, which is the
+    metric edits1 applies; unlike edits1, no alphabet is involved, so words
+    with accented letters are reached as well.
+
+    """
+
+    def __init__(self, words=()):
+        """Build the tree.
+
+        words (iterable): the dictionary.
+
+        """
+        # Nodes are stored in two parallel lists: node i holds the word
+        # _words[i] and its children in _children[i], a dictionary mapping
+        # distances to node indexes (None for leaves).
+        self._words = []
+        self._children = []
+        for w in words:
+            self.add(w)
+
+    @classmethod
+    def load(cls, path):
+        """Load a tree saved with save().
+
+        path (string): the path of the file.
+
+        return (BKTree): the tree.
+
+        """
+        tree = cls()
+        with codecs.open(path, 'r', 'utf8') as f:
+            for line in f:
+                vals = line.rstrip('\n').split(' ', 2)
+                tree._append(vals[2], int(vals[0]), int(vals[1]))
+        return tree
+
+    def save(self, path):
+        """Save the tree in a text file: each line holds the parent index,
+        the distance from the parent and the word of a node, parents first.
+
+        path (string): the path of the file.
+
+        """
+        parents = [(-1, 0)] * len(self._words)
+        for idx, children in enumerate(self._children):
+            for dist, child in (children or {}).items():
+                parents[child] = (idx, dist)
+        with codecs.open(path, 'w', 'utf8') as f:
+            for idx, w in enumerate(self._words):
+                f.write("%d %d %s\n" % (parents[idx][0], parents[idx][1], w))
+
+    def _append(self, word, parent, dist):
+        """Append a new node to the tree.
+
+        word (string): the word of the node.
+        parent (int): the index of the parent node (-1 for the root).
+        dist (int): the distance between word and the parent's word.
+
+        """
+        self._words.append(word)
+        self._children.append(None)
+        if parent >= 0:
+            if self._children[parent] is None:
+                self._children[parent] = {}
+            self._children[parent][dist] = len(self._words) - 1
+
+    def add(self, word):
+        """Add a word to the tree (nothing happens if it's already there).
+
+        word (string): the word to be added.
+
+        """
+        if not self._words:
+            self._append(word, -1, 0)
+            return
+        node = 0
+        while True:
+            dist = damerau_levenshtein(word, self._words[node])
+            if dist == 0:
+                return
+            children = self._children[node]
+            if children is None or dist not in children:
+                self._append(word, node, dist)
+                return
+            node = children[dist]
+
+    def __contains__(self, word):
+        return word in self.search(word, 0)[0]
+
+    def __len__(self):
+        return len(self._words)
+
+    def search(self, word, max_distance):
+        """Return every word within max_distance from word, in a single
+        traversal.
+
+        word (string): the (possibly misspelled) word.
+        max_distance (int): the maximum distance.
+
+        return ((dict, int)): the words found, mapped to their distance
+            from word, and the number of visited nodes.
+
+        """
+        found = {}
+        visited = 0
+        stack = [0] if self._words else []
+        while stack:
+            node = stack.pop()
+            visited += 1
+            dist = damerau_levenshtein(word, self._words[node])
+            if dist <= max_distance:
+                found[self._words[node]] = dist
+            children = self._children[node]
+            if children is None:
+                continue
+            for d in range(max(dist - max_distance, 1),
+                           dist + max_distance + 1):
+                if d in children:
+                    stack.append(children[d])
+        return found, visited
+
+    def candidates(self, word, max_distance=2, stats=None):
+        """Return the known words within max_distance from word, grouped by
+        distance.
+
+        word (string): the (possibly misspelled) word.
+        max_distance (int): the maximum distance.
+        stats (Counter): if given, the number of visited nodes is added to
+            stats['bktree_visited'].
+
+        return (list): a list of max_distance + 1 sets, the i-th one
+            containing the known words within distance i.
+
+        """
+        found, visited = self.search(word, max_distance)
+        if stats is not None:
+            stats['bktree_visited'] += visited
+        return group(found, max_distance)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Script to build a BK-tree from a list of words.")
+    parser.add_argument("-f", "--file", help="source file with words",
+                        required=True)
+    parser.add_argument("-o", "--output", help="output file with the tree",
+                        required=True)
+
+    args = parser.parse_args()
+
+    tree = BKTree()
+    with codecs.open(args.file, 'r', 'utf8') as f:
+        for line in f:
+            tree.add(line.rstrip('\n'))
+    tree.save(args.output)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Bloom filter of the stored n-gram keys.
+
+Most bigrams of the candidates do not exist, and each of them costs a lookup
+returning nothing. A Bloom filter of the stored keys answers "certainly
+missing" for almost all of them without any round trip; the few false
+positives (error_rate of the missing keys) are looked up as usual.
+
+The file is made of the magic string MAGIC, the number of bits m, the
+number of hashes k and the number of keys added (little-endian unsigned 64
+bits each), then the m bits. Positions are derived from the MD5 of the UTF-8
+key (double hashing), so files are the same for Python 2 and 3.
+
+"""
+
+import hashlib
+import math
+import struct
+
+MAGIC = b'BLOOM001'
+_HEADER = struct.Struct('<3Q')
+
+
+class BloomFilter(object):
+    """Bloom filter of strings.
+
+    """
+
+    def __init__(self, capacity=1, error_rate=0.01):
+        """Initialize an empty filter.
+
+        capacity (int): the number of keys that will be added.
+        error_rate (float): the false positive rate once capacity keys have
+            been added.
+
+        """
+        capacity = max(capacity, 1)
+        self.m = max(int(math.ceil(-capacity * math.log(error_rate) /
+                                   math.log(2) ** 2)), 8)
+        self.k = max(int(round(float(self.m) / capacity * math.log(2))), 1)
+        self.count = 0
+        self._bits = bytearray((self.m + 7) // 8)
+
+    @classmethod
+    def load(cls, path):
+        """Load a filter written by save().
+
+        path (string): the path of the file.
+
+        return (BloomFilter): the filter.
+
+        """
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("%s is not a Bloom filter." % path)
+            res = cls()
+            res.m, res.k, res.count = _HEADER.unpack(f.read(_HEADER.size))
+            res._bits = bytearray(f.read())
+        if len(res._bits) != (res.m + 7) // 8:
+            raise ValueError("%s is truncated." % path)
+        return res
+
+    def save(self, path):
+        """Write the filter.
+
+        path (string): the path of the file.
+
+        """
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_HEADER.pack(self.m, self.k, self.count))
+            f.write(self._bits)
+
+    def _positions(self, key):
+        if not isinstance(key, bytes):
+            key = key.encode('utf8')
+        h1, h2 = struct.unpack('<2Q', hashlib.md5(key).digest())
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def add(self, key):
+        """Add key to the filter.
+
+        key (string): the key.
+
+        """
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        for pos in self._positions(key):
+            if not self._bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+
+class FilteredStore(object):
+    """Store (see ngrams) skipping the keys that a Bloom filter rules out.
+
+    """
+
+    def __init__(self, store, bloom, name='bloom'):
+        """Initialize the store.
+
+        store (object): the wrapped store.
+        bloom (BloomFilter): the filter of the keys of store.
+        name (string): the prefix of the counter added to stats.
+
+        """
+        self.store = store
+        self.bloom = bloom
+        self.name = name
+
+    def mget(self, keys, stats=None):
+        present = [idx for idx, key in enumerate(keys) if key in self.bloom]
+        if stats is not None:
+            stats[self.name + '_skipped'] += len(keys) - len(present)
+        values = [None] * len(keys)
+        if present:
+            fetched = self.store.mget([keys[idx] for idx in present], stats)
+            for idx, value in zip(present, fetched):
+                values[idx] = value
+        return values
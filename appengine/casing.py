@@ -0,0 +1,71 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Casing of the input words.
+
+Words and n-gram keys are lowercase (see computeFrequencies.py), so words
+are corrected case-folded and the casing of the input is applied to the
+corrections afterwards.
+
+"""
+
+LOWER = 'lower'
+TITLE = 'title'
+UPPER = 'upper'
+
+
+def pattern(word):
+    """Return the casing pattern of word.
+
+    word (string): the word as typed.
+
+    return (string|None): LOWER, TITLE ("Roma"), UPPER ("ITALIA"), or None
+        if the casing is mixed ("McDonald").
+
+    """
+    if word == word.lower():
+        return LOWER
+    if len(word) > 1 and word == word.upper():
+        return UPPER
+    if word[1:] == word[1:].lower():
+        return TITLE
+    return None
+
+
+def restore(typed, folded, corrected):
+    """Return the correction with the casing of the typed word.
+
+    typed (string): the word as typed.
+    folded (string): the case-folded word that was corrected.
+    corrected (string): its correction.
+
+    return (string): the typed word if it was not corrected, the correction
+        with the casing of the typed word otherwise (lowercase if the casing
+        was mixed).
+
+    """
+    if corrected == folded:
+        return typed
+    casing = pattern(typed)
+    if casing == UPPER:
+        return corrected.upper()
+    if casing == TITLE:
+        # Not str.title(), which would capitalize after apostrophes too.
+        return corrected[:1].upper() + corrected[1:]
+    return corrected
@@ -0,0 +1,118 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Context-first candidate generation.
+
+The plausible corrections of a word are, most of the time, among the words
+that actually follow the previous word (or precede the next one) in the
+corpus. The index keeps the most frequent successors and predecessors of
+each word, so that the candidates of a word in context are found with a few
+hundred distance checks; words whose context offers no candidate are left
+to the general-purpose generators.
+
+The file (written by frequenciesToContext.py) has one line per word and
+direction: 'next' or 'prev', the word, then its successors or predecessors,
+from the most to the least frequent, all separated by spaces.
+
+"""
+
+import codecs
+
+from edits import damerau_levenshtein
+
+
+class ContextIndex(object):
+    """Index of the most frequent successors and predecessors of words.
+
+    """
+
+    def __init__(self, successors, predecessors):
+        """Initialize the index.
+
+        successors (dict): the successors of each word (a sequence).
+        predecessors (dict): the predecessors of each word (a sequence).
+
+        """
+        self.successors = successors
+        self.predecessors = predecessors
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by frequenciesToContext.py.
+
+        path (string): the path of the file.
+
+        return (ContextIndex): the index.
+
+        """
+        successors = {}
+        predecessors = {}
+        with codecs.open(path, 'r', 'utf8') as f:
+            for line in f:
+                vals = line.rstrip('\n').split(' ')
+                if vals[0] == 'next':
+                    successors[vals[1]] = tuple(vals[2:])
+                else:
+                    predecessors[vals[1]] = tuple(vals[2:])
+        return cls(successors, predecessors)
+
+    def candidates(self, word_prev, word, word_next, max_distance=2,
+                   words=None, stats=None):
+        """Return the words of the context of word within max_distance from
+        it, grouped by distance.
+
+        word_prev (string|set|None): the previous word, or the set of the
+            words it can be (the successors of all of them are looked at).
+        word (string): the (possibly misspelled) word.
+        word_next (string|None): the next word.
+        max_distance (int): the maximum distance.
+        words (object|None): if given, the dictionary (supporting 'in') the
+            candidates must belong to.
+        stats (Counter): if given, 'context_hits' or 'context_fallbacks' is
+            incremented.
+
+        return (list|None): a list of max_distance + 1 sets, the i-th one
+            containing the words within distance i, or None if the context
+            offers no candidate.
+
+        """
+        context = set()
+        if isinstance(word_prev, (set, frozenset)):
+            for w in word_prev:
+                context.update(self.successors.get(w, ()))
+        elif word_prev is not None:
+            context.update(self.successors.get(word_prev, ()))
+        if word_next is not None:
+            context.update(self.predecessors.get(word_next, ()))
+
+        res = [set() for _ in range(max_distance + 1)]
+        found = False
+        for c in context:
+            if abs(len(c) - len(word)) > max_distance or \
+                    (words is not None and c not in words):
+                continue
+            dist = damerau_levenshtein(word, c)
+            if dist <= max_distance:
+                found = True
+                for i in range(dist, max_distance + 1):
+                    res[i].add(c)
+
+        if stats is not None:
+            stats['context_hits' if found else 'context_fallbacks'] += 1
+        return res if found else None
@@ -0,0 +1,197 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Candidate generation by enumerating edits (Norvig's approach).
+
+"""
+
+alphabet = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def edits1(word):
+    """Return every string that is one edit away from word.
+
+    An edit is a deletion, a transposition of two adjacent letters, a
+    replacement or an insertion. Replacements and insertions only use
+    letters from alphabet.
+
+    word (string): the word to be edited.
+
+    return (set): the edited strings.
+
+    """
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    deletes = [a + b[1:] for a, b in splits if b]
+    transposes = [a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1]
+    replaces = [a + c + b[1:] for a, b in splits for c in alphabet if b]
+    inserts = [a + c + b for a, b in splits for c in alphabet]
+    return set(deletes + transposes + replaces + inserts)
+
+
+def known_edits2(word, words):
+    """Return the words in words that are two edits away from word.
+
+    word (string): the word to be edited.
+    words (set): the dictionary.
+
+    return (set): the known words within two edits.
+
+    """
+    return set(e2 for e1 in edits1(word) for e2 in edits1(e1) if e2 in words)
+
+
+def known(candidates, words):
+    """Return the candidates that belong to the dictionary.
+
+    candidates (iterable): the strings to be checked.
+    words (set): the dictionary.
+
+    return (set): the known candidates.
+
+    """
+    return set(w for w in candidates if w in words)
+
+
+def damerau_levenshtein(a, b):
+    """Return the (unrestricted) Damerau-Levenshtein distance between a
+    and b, i.e. the minimum number of deletions, insertions, replacements
+    and adjacent transpositions needed to turn a into b.
+
+    a (string): the first string.
+    b (string): the second string.
+
+    return (int): the distance.
+
+    """
+    inf = len(a) + len(b)
+    last_row = {}
+    d = [[inf] * (len(b) + 2)]
+    d.append([inf] + list(range(len(b) + 1)))
+    for i in range(1, len(a) + 1):
+        d.append([inf, i] + [0] * len(b))
+        last_match_col = 0
+        for j in range(1, len(b) + 1):
+            k = last_row.get(b[j - 1], 0)
+            l = last_match_col
+            if a[i - 1] == b[j - 1]:
+                cost = 0
+                last_match_col = j
+            else:
+                cost = 1
+            d[i + 1][j + 1] = min(d[i][j] + cost,
+                                  d[i + 1][j] + 1,
+                                  d[i][j + 1] + 1,
+                                  d[k][l] + (i - k - 1) + 1 + (j - l - 1))
+        last_row[a[i - 1]] = i
+    return d[len(a) + 1][len(b) + 1]
+
+
+def aligned_bound(max_distance):
+    """Return how far to search with optimal string alignment distances to
+    find every word within a Damerau-Levenshtein distance.
+
+    Aligned distances (as computed row by row, or bit-parallel) never edit a
+    substring twice, so they overestimate the unrestricted distance when
+    characters are inserted between transposed ones ("buc" and "cb" are at
+    distance 2, but 3 apart as aligned strings). Each such edit costs at
+    least 2 and is overestimated by 1, and up to 2 both distances agree:
+    searching up to the returned bound and passing the words found to
+    exact_distance() gives the Damerau-Levenshtein ones.
+
+    max_distance (int): the maximum Damerau-Levenshtein distance.
+
+    return (int): the maximum aligned distance.
+
+    """
+    return max_distance + max_distance // 2
+
+
+def exact_distance(a, b, aligned):
+    """Return the Damerau-Levenshtein distance between a and b given their
+    optimal string alignment distance (see aligned_bound()).
+
+    a (string): the first string.
+    b (string): the second string.
+    aligned (int): their aligned distance.
+
+    return (int): the distance.
+
+    """
+    if aligned <= 2:
+        return aligned
+    return damerau_levenshtein(a, b)
+
+
+def group(found, max_distance):
+    """Return words found within max_distance, grouped as the candidates()
+    of the generators return them.
+
+    found (dict): the words, mapped to their distance.
+    max_distance (int): the maximum distance.
+
+    return (list): a list of max_distance + 1 sets, the i-th one containing
+        the words within distance i.
+
+    """
+    return [set(w for w, d in found.items() if d <= i)
+            for i in range(max_distance + 1)]
+
+
+class Edits(object):
+    """Candidate generator that enumerates edits and filters them against a
+    dictionary.
+
+    Every candidate generator exposes the same interface: membership test
+    (the 'in' operator) and candidates(word, max_distance, stats).
+
+    """
+
+    def __init__(self, words):
+        """Initialize the generator.
+
+        words (set): the dictionary.
+
+        """
+        self._words = words
+
+    def __contains__(self, word):
+        return word in self._words
+
+    def __len__(self):
+        return len(self._words)
+
+    def candidates(self, word, max_distance=2, stats=None):
+        """Return the known words reachable from word, grouped by edits.
+
+        word (string): the (possibly misspelled) word.
+        max_distance (int): the maximum number of edits (at most 2).
+        stats (Counter): if given, generators that have something to report
+            (e.g. how much work a lookup took) add their counters to it.
+
+        return (list): a list of max_distance + 1 sets, the i-th one
+            containing the known words within i edits (the same sets
+            as known([word]), known(edits1(word)) and known_edits2(word)).
+
+        """
+        res = [known([word], self._words)]
+        if max_distance >= 1:
+            res.append(known(edits1(word), self._words))
+        if max_distance >= 2:
+            res.append(known_edits2(word, self._words))
+        return res
@@ -0,0 +1,96 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Vectorized scoring of candidates in log space (needs NumPy).
+
+The probability of a candidate w after the word w_prev is the product of its
+unigram probability, of the probabilities of the bigrams (w_prev, w) and
+(w, w_prev) given their first word and of its channel probability. Every
+probability is estimated with add-alpha smoothing, over the V words of the
+dictionary:
+
+    P(w) = (c(w) + alpha) / (N + alpha * V)
+    P(w2 | w1) = (c(w1 w2) + alpha) / (c(w1) + alpha * V)
+
+where N is the total of the unigram counts. Unlike replacing missing counts
+with 1, a missing bigram is worth less than one seen once, and the
+logarithms are summed as floats, so that huge counts never turn into
+arbitrary-precision integers.
+
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _counts(values):
+    return numpy.fromiter((float(v or 0) for v in values),
+                          dtype=numpy.float64, count=len(values))
+
+
+def log_probabilities(unigrams, lefts, rights, channel, prev_count, total,
+                      vocabulary, alpha=1.0):
+    """Return the log-probabilities of the candidates.
+
+    unigrams (list): the unigram count of each candidate (None if unknown).
+    lefts (list): the count of the bigram of the previous word with each
+        candidate (None if unknown).
+    rights (list): the count of the bigram of each candidate with the
+        previous word (None if unknown).
+    channel (list): the channel model probability of each candidate.
+    prev_count (int|None): the unigram count of the previous word (0 if
+        unknown), None if there is no previous word (bigrams are not scored
+        then).
+    total (int): the total N of the unigram counts.
+    vocabulary (int): the number V of words.
+    alpha (float): the smoothing constant added to every count.
+
+    return (numpy.ndarray): the log-probabilities.
+
+    """
+    if numpy is None:
+        raise RuntimeError("Log-space scoring needs NumPy.")
+    counts = _counts(unigrams)
+    res = (numpy.log(counts + alpha) -
+           numpy.log(total + alpha * vocabulary) +
+           numpy.log(numpy.asarray(channel, dtype=numpy.float64)))
+    if prev_count is not None:
+        res += (numpy.log(_counts(lefts) + alpha) -
+                numpy.log(prev_count + alpha * vocabulary) +
+                numpy.log(_counts(rights) + alpha) -
+                numpy.log(counts + alpha * vocabulary))
+    return res
+
+
+def best(unigrams, lefts, rights, channel, prev_count, total, vocabulary,
+         alpha=1.0):
+    """Return the best candidate (the first one, in case of ties).
+
+    See log_probabilities() for the arguments.
+
+    return ((int, float)): the index of the best candidate and its
+        log-probability.
+
+    """
+    scores = log_probabilities(unigrams, lefts, rights, channel, prev_count,
+                               total, vocabulary, alpha)
+    idx = int(numpy.argmax(scores))
+    return idx, float(scores[idx])
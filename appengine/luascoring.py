@@ -0,0 +1,150 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Server-side scoring of candidates with a Lua script.
+
+Instead of fetching three counts per candidate and multiplying them here,
+the candidates and their channel probabilities are sent to Redis, which
+scores them next to the data and replies with the winner only.
+
+The script reads unigrams and bigrams (stored as plain keys) from their
+databases with SELECT, so it needs Redis 2.8.12 or later (where SELECT
+inside a script does not change the database of the connection). Counts are
+multiplied as doubles, so scores may differ from the client-side ones in the
+last bits.
+
+"""
+
+from redis.exceptions import NoScriptError
+
+# ARGV: the unigrams database, the bigrams database, '1' if there is a
+# previous word (else '0'), the previous word, then each candidate followed
+# by its channel probability. Reply: the (1-based) index of the best
+# candidate and its score (as a string, Redis would truncate a number).
+SCRIPT = """
+local function mget(keys)
+    local values = {}
+    for i = 1, #keys, 1000 do
+        local chunk = redis.call('MGET',
+                                 unpack(keys, i, math.min(i + 999, #keys)))
+        for j = 1, #chunk do
+            values[i + j - 1] = chunk[j]
+        end
+    end
+    return values
+end
+
+local function count(value)
+    return math.floor(tonumber(value) or 1)
+end
+
+local words = {}
+local left = {}
+local right = {}
+local prev = ARGV[4]
+for i = 5, #ARGV, 2 do
+    local w = ARGV[i]
+    words[#words + 1] = w
+    left[#left + 1] = prev .. ' ' .. w
+    right[#right + 1] = w .. ' ' .. prev
+end
+
+redis.call('SELECT', ARGV[2])
+local lefts = {}
+local rights = {}
+if ARGV[3] == '1' then
+    lefts = mget(left)
+    rights = mget(right)
+end
+redis.call('SELECT', ARGV[1])
+local unigrams = mget(words)
+
+local best = 0
+local best_score = -1
+for i = 1, #words do
+    local score = count(unigrams[i]) * count(lefts[i]) * count(rights[i]) *
+        tonumber(ARGV[4 + 2 * i])
+    if score > best_score then
+        best = i
+        best_score = score
+    end
+end
+return {best, string.format('%.17g', best_score)}
+"""
+
+
+class LuaScorer(object):
+    """Scorer of candidates running in Redis.
+
+    """
+
+    def __init__(self, redis, unigrams_db=0, bigrams_db=1):
+        """Initialize the scorer.
+
+        redis (redis.client.StrictRedis): an established connection to the
+            Redis instance holding both databases.
+        unigrams_db (int): the database of unigrams.
+        bigrams_db (int): the database of bigrams.
+
+        """
+        self.redis = redis
+        self.unigrams_db = unigrams_db
+        self.bigrams_db = bigrams_db
+        self.sha = None
+
+    def register(self):
+        """Load the script into Redis, which keeps it until it's restarted
+        (or SCRIPT FLUSH is issued).
+
+        """
+        self.sha = self.redis.script_load(SCRIPT)
+
+    def best(self, extended_candidates, word_prev=None, stats=None):
+        """Return the best candidate.
+
+        extended_candidates (list): the candidates, each in the form
+            [w_prev, w, w_next, channel model probability].
+        word_prev (string|None): the previous word.
+        stats (Counter): the counters of the request (optional).
+
+        return ((int, float)): the index of the best candidate and its
+            probability.
+
+        raise (redis.exceptions.RedisError): if the script can't be run.
+
+        """
+        args = [self.unigrams_db, self.bigrams_db,
+                '0' if word_prev is None else '1', word_prev or '']
+        for candidate in extended_candidates:
+            args.append(candidate[1])
+            args.append(repr(candidate[3]))
+
+        if self.sha is None:
+            self.register()
+        try:
+            idx, best_score = self.redis.evalsha(self.sha, 0, *args)
+        except NoScriptError:
+            # Redis was restarted or its scripts flushed: load it again.
+            if stats is not None:
+                stats['lua_reloads'] += 1
+            self.register()
+            idx, best_score = self.redis.evalsha(self.sha, 0, *args)
+        if stats is not None:
+            stats['lua_scored'] += len(extended_candidates)
+        return idx - 1, float(best_score)
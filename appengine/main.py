@@ -19,15 +19,34 @@
 
 from __future__ import division
 
+import beam
+import bktree
+import bloom
+import casing
 import codecs
 import collections
+import context
 import datetime
+import edits
 import flask_restful
+import logscore
+import luascoring
+import math
+import ngrams
+import neighbors
+import ngramstore
+import normalize
+import qgram
 import redis
+import segmentation
+import symdelete
 import sys
+import tokenizer
+import trie
+import wordids
 import yaml
 
-from flask import Flask
+from flask import Flask, request
 
 from flask_restful.utils import cors
 from google.appengine.api import memcache
@@ -39,19 +58,9 @@ api = flask_restful.Api(app)
 # Enable CORS.
 api.decorators = [cors.crossdomain(origin='*')]
 
-alphabet = 'abcdefghijklmnopqrstuvwxyz'
-
-# Read words set.
-WORDS = set()
-with codecs.open('words', 'r', 'utf8') as f:
-    for line in f:
-        WORDS.add(line.rstrip('\n'))
-init_time = datetime.datetime.now()
-
-# Redis connections.
-
 # Try to read Redis's password from config.yaml. Silently ignore errors.
 password = None
+cfg = {}
 try:
     with open('config.yaml', 'r') as f:
         cfg = yaml.load(f)
@@ -59,42 +68,460 @@ try:
 except (IOError, KeyError, ValueError):
     raise
 
+# Candidate generator: 'edits' (default) enumerates edits1/known_edits2,
+# 'symdelete' precomputes a symmetric-delete index of WORDS (faster lookups
+# at the price of a bigger memory footprint), 'bktree' searches a BK-tree
+# of WORDS (loaded from 'bktree_file' if set, built here otherwise), 'trie'
+# searches a compact trie (loaded from 'trie_file' if set, built from the
+# words file otherwise) which also replaces the set of words, 'qgram'
+# verifies the words sharing enough q-grams with the query (q is set with
+# 'qgram_q').
+CANDIDATES_TYPE = cfg.get('candidates', 'edits')
+if CANDIDATES_TYPE == 'trie':
+    if cfg.get('trie_file'):
+        WORDS = trie.Trie.load(cfg['trie_file'])
+    else:
+        with codecs.open('words', 'r', 'utf8') as f:
+            WORDS = trie.Trie(line.rstrip('\n') for line in f)
+    CANDIDATES = WORDS
+else:
+    # Read words set.
+    WORDS = set()
+    with codecs.open('words', 'r', 'utf8') as f:
+        for line in f:
+            WORDS.add(line.rstrip('\n'))
+
+    if CANDIDATES_TYPE == 'symdelete':
+        CANDIDATES = symdelete.SymmetricDeleteIndex(WORDS)
+    elif CANDIDATES_TYPE == 'bktree':
+        if cfg.get('bktree_file'):
+            CANDIDATES = bktree.BKTree.load(cfg['bktree_file'])
+        else:
+            CANDIDATES = bktree.BKTree(WORDS)
+    elif CANDIDATES_TYPE == 'qgram':
+        CANDIDATES = qgram.QGramIndex(WORDS, cfg.get('qgram_q', 2))
+    else:
+        CANDIDATES = edits.Edits(WORDS)
+
+# Graph of the neighbors of frequent words (written by
+# frequenciesToNeighbors.py, with the same candidates as 'edits'), loaded by
+# the first request up to 'neighbors_budget' bytes: known words are looked
+# up there, the others are handed to the generator above.
+if cfg.get('neighbors_file'):
+    CANDIDATES = neighbors.NeighborGraph(
+        cfg['neighbors_file'], CANDIDATES,
+        cfg.get('neighbors_budget', 64 * 2 ** 20))
+
+# Index of the most frequent successors and predecessors of each word
+# (written by frequenciesToContext.py): if set, the candidates of a word are
+# first looked for among the successors of the previous word and the
+# predecessors of the next one, and only generated when none is close
+# enough. Batched corrections don't know the previous word in advance, so
+# they look among the successors of all its candidates.
+CONTEXT = None
+if cfg.get('context_file'):
+    CONTEXT = context.ContextIndex.load(cfg['context_file'])
+
+# Table of common misspellings (written by frequenciesToTypos.py): the words
+# it contains are replaced by their correction, without looking for any
+# candidate.
+TYPOS = {}
+if cfg.get('typos_file'):
+    with codecs.open(cfg['typos_file'], 'r', 'utf8') as f:
+        for idx, line in enumerate(f):
+            if idx > 0:  # skip first line (header)
+                typo, correction = line.rstrip('\n').split(' ')
+                TYPOS[typo] = correction
+init_time = datetime.datetime.now()
+
+# Whether elided words ("dell'anno") are corrected apart from the word they
+# precede: it must match how the counts were computed (computeFrequencies.py
+# --split-elisions).
+SPLIT_ELISIONS = cfg.get('split_elisions', False)
+
+# Maximum edit distance of candidates (3 is only supported by 'bktree',
+# 'trie' and 'qgram') and channel model probability of each distance.
+MAX_DISTANCE = cfg.get('max_distance', 2)
+CHANNEL_PROBABILITIES = [1.0, .001, .0001, .00001]
+
+# Tiered mode (the default can be overridden by each request with the
+# 'tiered' parameter) and the count of the most frequent unigram, needed to
+# bound the probability of farther candidates.
+TIERED = cfg.get('tiered', False)
+MAX_UNIGRAM_COUNT = cfg.get('max_unigram_count')
+
+# Batched mode (the default can be overridden by each request with the
+# 'batch' parameter) and the maximum number of keys a sentence can fetch in
+# batched mode before falling back to word-by-word correction.
+BATCH = cfg.get('batch', False)
+BATCH_MAX_KEYS = cfg.get('batch_max_keys', 100000)
+
+# Decoder of the sentences: 'greedy' (default) corrects the words from left
+# to right, each one given the correction of the previous one, 'beam'
+# searches the lattice of the candidates of the whole sentence keeping the
+# best 'beam_width' paths at each word (see beam.py). The beam decoder always
+# works in batched mode, whose single round trip fetches the counts of the
+# whole lattice, and falls back to greedy word-by-word correction with it.
+DECODER = cfg.get('decoder', 'greedy')
+BEAM_WIDTH = cfg.get('beam_width', 8)
+
+# Correction of missing and extra spaces (see segmentation.py), which needs
+# the total of the unigram counts (the second number of the header of the
+# unigrams frequencies file). Batched corrections fetch its counts in their
+# round trip, word-by-word ones in one more.
+SEGMENTATION = cfg.get('segmentation', False)
+UNIGRAM_TOTAL = cfg.get('unigram_total')
+if SEGMENTATION and not UNIGRAM_TOTAL:
+    raise ValueError("Segmentation needs unigram_total.")
+
+# Two-phase scoring: the unigram counts of all the candidates are fetched
+# first, then bigrams are only fetched for the candidates that can still win
+# (if 'prune_bound' is set, which keeps the corrections unchanged) and, if
+# 'prune_top_k' is positive, only for the top_k most probable ones according
+# to the unigram counts (which may change a few corrections). Batched
+# corrections fetch every count in their single round trip anyway, but they
+# are pruned the same way (by the beam decoder with a bound holding for any
+# previous word).
+PRUNE = cfg.get('prune', False)
+PRUNE_BOUND = cfg.get('prune_bound', True)
+PRUNE_TOP_K = cfg.get('prune_top_k', 0)
+
+# Scorer: 'product' (default) multiplies the raw counts (missing ones
+# counting as 1), 'log' sums with NumPy the logarithms of probabilities
+# estimated by adding 'log_smoothing' to the counts (see logscore.py), which
+# needs unigram_total and NumPy (listed in app.yaml). Tiered corrections
+# bound the scores of the 'product' scorer, so with 'log' requests are never
+# tiered.
+SCORER = cfg.get('scorer', 'product')
+LOG_SMOOTHING = cfg.get('log_smoothing', 1.0)
+if SCORER == 'log':
+    if logscore.numpy is None:
+        raise ImportError("The 'log' scorer needs NumPy.")
+    if not UNIGRAM_TOTAL:
+        raise ValueError("The 'log' scorer needs unigram_total.")
+    VOCABULARY = len(WORDS)
+
+# Redis connections.
 UNIGRAMS_REDIS = redis.StrictRedis(host='redis.spellcorrect.chiodini.org',
                                    port=6379, db=0, password=password)
 BIGRAMS_REDIS = redis.StrictRedis(host='redis.spellcorrect.chiodini.org',
                                   port=6379, db=1, password=password)
 
+# Stores of unigram and bigram counts: either Redis (keys are fetched with
+# MGET commands of at most 'mget_chunk_size' keys or, if 'unigrams_buckets'
+# or 'bigrams_buckets' is set, from that many hashes, as loaded by
+# frequenciesToRedis.py --buckets, or, if 'bigrams_by_word' is set, from
+# the per-word hashes loaded by frequenciesToRedis.py --by-word) or, if
+# 'ngram_store' is 'mmap', the files 'unigrams_file' and 'bigrams_file'
+# written by frequenciesToStore.py. In both cases they are behind an LRU
+# cache of at most 'ngram_cache_size' keys each (0 disables it), kept for
+# 'ngram_cache_ttl' seconds.
+if cfg.get('ngram_store', 'redis') == 'mmap':
+    UNIGRAMS = ngramstore.NGramStore(cfg['unigrams_file'])
+    BIGRAMS = ngramstore.NGramStore(cfg['bigrams_file'])
+else:
+    if cfg.get('unigrams_buckets'):
+        UNIGRAMS = ngrams.HashStore(UNIGRAMS_REDIS, cfg['unigrams_buckets'])
+    else:
+        UNIGRAMS = ngrams.RedisStore(UNIGRAMS_REDIS,
+                                     cfg.get('mget_chunk_size', 1000))
+    if cfg.get('bigrams_by_word'):
+        BIGRAMS = ngrams.WordHashStore(BIGRAMS_REDIS, cfg['bigrams_by_word'],
+                                       cfg.get('mget_chunk_size', 1000))
+    elif cfg.get('bigrams_buckets'):
+        BIGRAMS = ngrams.HashStore(BIGRAMS_REDIS, cfg['bigrams_buckets'])
+    else:
+        BIGRAMS = ngrams.RedisStore(BIGRAMS_REDIS,
+                                    cfg.get('mget_chunk_size', 1000))
+
+# Bigram keys: 'plain' ("w1 w2", default), 'ids' (packed word ids, see
+# wordids.py, ids being the ranks in 'word_ids_file', the unigrams
+# frequencies file) or 'both' (packed keys, falling back to plain keys while
+# a database is being migrated). The store must have been written with the
+# same ids: regenerating 'word_ids_file' needs reloading the bigrams. With
+# 'ids', a store holding no version (plain keys only) is refused as well.
+BIGRAM_KEYS = cfg.get('bigram_keys', 'plain')
+if BIGRAM_KEYS in ('ids', 'both'):
+    if cfg.get('bigrams_by_word'):
+        raise ValueError("Per-word bigram hashes need plain bigram keys.")
+    WORD_IDS = wordids.load(cfg['word_ids_file'])
+    try:
+        wordids.check_version(BIGRAMS, WORD_IDS, BIGRAM_KEYS == 'ids')
+    except redis.exceptions.RedisError:
+        # Redis is unreachable: the version can't be checked.
+        pass
+    BIGRAMS = wordids.IdEncodedStore(BIGRAMS, WORD_IDS, BIGRAM_KEYS == 'both')
+
+NGRAM_CACHE_SIZE = cfg.get('ngram_cache_size', 100000)
+NGRAM_CACHE_TTL = cfg.get('ngram_cache_ttl', 3600)
+if NGRAM_CACHE_SIZE > 0:
+    UNIGRAMS = ngrams.CachedStore(UNIGRAMS, NGRAM_CACHE_SIZE, NGRAM_CACHE_TTL,
+                                  'unigrams_cache')
+    BIGRAMS = ngrams.CachedStore(BIGRAMS, NGRAM_CACHE_SIZE, NGRAM_CACHE_TTL,
+                                 'bigrams_cache')
+
+# Bloom filter of the stored bigrams (written by computeFrequencies.py or
+# frequenciesToRedis.py --bloom): bigrams it rules out are never looked up.
+if cfg.get('bigrams_bloom_file'):
+    BIGRAMS = bloom.FilteredStore(
+        BIGRAMS, bloom.BloomFilter.load(cfg['bigrams_bloom_file']),
+        'bigrams_bloom')
+
+# Scoring: 'client' (default) fetches the counts and multiplies them here,
+# 'lua' scores the candidates of each word inside Redis with a script (see
+# luascoring.py) which reads plain keys from db 0 and 1 and replies with the
+# winner only; words are scored here whenever the script fails. Tiered and
+# batched corrections are always scored here. The script needs the plain
+# Redis layout, and it reads Redis directly, bypassing the cache and the
+# Bloom filter. It multiplies raw counts, as the 'product' scorer does, and
+# fetches every count of the candidates, so it can't be pruned.
+LUA_SCORER = None
+if cfg.get('scoring', 'client') == 'lua':
+    if cfg.get('ngram_store', 'redis') != 'redis' or \
+            cfg.get('unigrams_buckets') or cfg.get('bigrams_buckets') or \
+            cfg.get('bigrams_by_word') or BIGRAM_KEYS != 'plain':
+        raise ValueError("Lua scoring needs plain keys stored in Redis.")
+    if SCORER != 'product':
+        raise ValueError("Lua scoring needs the 'product' scorer.")
+    if PRUNE:
+        raise ValueError("Lua scoring can't be pruned.")
+    LUA_SCORER = luascoring.LuaScorer(UNIGRAMS_REDIS, 0, 1)
+    try:
+        LUA_SCORER.register()
+    except redis.exceptions.RedisError:
+        # It will be registered by the first request.
+        pass
+
 queries = 0
 
 
-def edits1(word):
-    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
-    deletes = [a + b[1:] for a, b in splits if b]
-    transposes = [a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1]
-    replaces = [a + c + b[1:] for a, b in splits for c in alphabet if b]
-    inserts = [a + c + b for a, b in splits for c in alphabet]
-    return set(deletes + transposes + replaces + inserts)
+def fetch(extended_candidates, word_prev=None, stats=None, lookup=None):
+    """Fetch the counts needed to score the candidates.
 
+    extended_candidates (list): the candidates, each in the form
+        [w_prev, w, w_next, channel model probability].
+    word_prev (string|None): if given, its unigram count is fetched in the
+        same round trip.
+    stats (Counter): the counters of the request (optional).
+    lookup (Lookup|None): if given, the counts it already fetched are not
+        fetched again.
 
-def known_edits2(word):
-    return set(e2 for e1 in edits1(word) for e2 in edits1(e1) if e2 in WORDS)
+    return (Lookup): the lookup holding the counts.
 
+    """
+    # As the number of queries can be really high and we aim for efficiency,
+    # a critical aspect is the number of back-and-forth TCP packets between the
+    # client and the server. Redis instance can theoretically be in a different
+    # server; this adds some latency to every single query (in the order of
+    # tens of milliseconds) and leads to unacceptable global response times.
+    # By taking advantage of Redis pipelines, all the queries are initially
+    # buffered and then issued at once, dramatically increasing performances.
+    # Moreover, each distinct key is fetched only once.
+
+    if lookup is None:
+        lookup = ngrams.Lookup(UNIGRAMS, BIGRAMS, stats)
+
+    for candidate in extended_candidates:
+        w_prev = candidate[0]
+        w = candidate[1]
+        lookup.add_unigram(w)
+        lookup.add_bigram(w_prev, w)
+        lookup.add_bigram(w, w_prev)
 
-def known(words):
-    return set(w for w in words if w in WORDS)
+    if word_prev is not None:
+        lookup.add_unigram(word_prev)
 
+    lookup.fetch()
+    return lookup
 
-def correct(word_prev, word, word_next):
-    candidates = []
 
-    # Add the word itself with 1.0 prob
-    candidates.append([known([word]) | set([word]), 1.0])
+def score(extended_candidates, word_prev=None, stats=None, lookup=None):
+    """Fetch the counts of the candidates and append to each of them its
+    probability.
 
-    # Add known words within edit distance 1 with 10^-3 prob
-    candidates.append([known(edits1(word)), .001])
+    extended_candidates (list): the candidates, each in the form
+        [w_prev, w, w_next, channel model probability].
+    word_prev (string|None): if given, its unigram count is fetched in the
+        same round trip and returned.
+    stats (Counter): the counters of the request (optional).
+    lookup (Lookup|None): if given, the counts it already fetched are not
+        fetched again.
+
+    return (int|None): the unigram count of word_prev (1 if unknown).
+
+    """
+    lookup = fetch(extended_candidates, word_prev, stats, lookup)
+
+    # Compute the probability for each candidate.
+    for candidate in extended_candidates:
+        w_prev = candidate[0]
+        w = candidate[1]
+        p1 = lookup.unigram(w) or 1.0
+        p2 = lookup.bigram(w_prev, w) or 1.0
+        p3 = lookup.bigram(w, w_prev) or 1.0
+        p4 = candidate[3]
+        candidate.append(int(p1) * int(p2) * int(p3) * p4)
 
-    # Add known words within edit distance 2 with 10^-4 prob
-    candidates.append([known_edits2(word), .0001])
+    if word_prev is not None:
+        return int(lookup.unigram(word_prev) or 1)
+
+
+def log_probabilities(word_prev, extended_candidates, lookup):
+    """Return the log-probabilities of the candidates with smoothed counts
+    (see logscore.py).
+
+    word_prev (string|None): the previous word.
+    extended_candidates (list): the candidates, each in the form
+        [w_prev, w, w_next, channel model probability].
+    lookup (Lookup): the lookup holding the counts of the candidates and of
+        word_prev.
+
+    return (numpy.ndarray): the log-probabilities.
+
+    """
+    prev_count = None
+    if word_prev is not None:
+        prev_count = int(lookup.unigram(word_prev) or 0)
+    return logscore.log_probabilities(
+        [lookup.unigram(c[1]) for c in extended_candidates],
+        [lookup.bigram(word_prev, c[1]) for c in extended_candidates],
+        [lookup.bigram(c[1], word_prev) for c in extended_candidates],
+        [c[3] for c in extended_candidates], prev_count, UNIGRAM_TOTAL,
+        VOCABULARY, LOG_SMOOTHING)
+
+
+def score_log(extended_candidates, word_prev=None, stats=None, lookup=None):
+    """Fetch the counts of the candidates and return the best one, scored in
+    log space with smoothed counts (see logscore.py).
+
+    extended_candidates (list): the candidates, each in the form
+        [w_prev, w, w_next, channel model probability].
+    word_prev (string|None): the previous word.
+    stats (Counter): the counters of the request (optional).
+    lookup (Lookup|None): if given, the counts it already fetched are not
+        fetched again.
+
+    return (list): the best candidate, with its log-probability appended.
+
+    """
+    lookup = fetch(extended_candidates, word_prev, stats, lookup)
+    scores = log_probabilities(word_prev, extended_candidates, lookup)
+    idx = int(logscore.numpy.argmax(scores))
+    best = extended_candidates[idx]
+    best.append(float(scores[idx]))
+    return best
+
+
+def prune(extended_candidates, word_prev=None, stats=None, lookup=None,
+          any_prev=False):
+    """Fetch the unigram counts of the candidates and return the ones whose
+    bigrams are worth fetching.
+
+    A bigram can't be more frequent than its words, so the probability of a
+    candidate is at least its unigram count times its channel probability
+    (bigrams not found count as 1) and at most that times the square of the
+    smaller of its count and the count of word_prev. Candidates whose upper
+    bound is lower than the lower bound of another one can't win.
+
+    extended_candidates (list): the candidates, each in the form
+        [w_prev, w, w_next, channel model probability].
+    word_prev (string|None): the previous word.
+    stats (Counter): the counters of the request (optional).
+    lookup (Lookup|None): if given, the lookup that already fetched the
+        unigram counts of the candidates and of word_prev.
+    any_prev (bool): whether the bound must hold whatever the previous word
+        (ignoring word_prev), as the beam decoder needs.
+
+    return ((list, Lookup)): the remaining candidates (in the same order)
+        and the lookup holding the counts fetched.
+
+    """
+    if lookup is None:
+        lookup = ngrams.Lookup(UNIGRAMS, BIGRAMS, stats)
+        for candidate in extended_candidates:
+            lookup.add_unigram(candidate[1])
+        if word_prev is not None:
+            lookup.add_unigram(word_prev)
+        lookup.fetch()
+
+    prev_count = 1
+    if word_prev is not None:
+        prev_count = int(lookup.unigram(word_prev) or 1.0)
+    lows = []
+    highs = []
+    for candidate in extended_candidates:
+        count = int(lookup.unigram(candidate[1]) or 1.0)
+        bigram_count = count if any_prev else max(min(count, prev_count), 1)
+        lows.append(count * candidate[3])
+        highs.append(count * bigram_count * bigram_count * candidate[3])
+
+    keep = range(len(extended_candidates))
+    if PRUNE_BOUND:
+        best_low = max(lows)
+        keep = [idx for idx in keep if highs[idx] >= best_low]
+    if 0 < PRUNE_TOP_K < len(keep):
+        keep = sorted(sorted(keep, key=lambda idx: -lows[idx])[:PRUNE_TOP_K])
+
+    if stats is not None:
+        stats['prune_candidates'] += len(extended_candidates)
+        stats['prune_kept'] += len(keep)
+    return [extended_candidates[idx] for idx in keep], lookup
+
+
+def tier_bound(distance, prev_count):
+    """Return an upper bound of the probability of any candidate at the
+    given edit distance.
+
+    A bigram can't be more frequent than its words, so both bigram counts
+    are at most the unigram count of the previous word, while the unigram
+    count of the candidate is at most MAX_UNIGRAM_COUNT.
+
+    distance (int): the edit distance of the candidates.
+    prev_count (int|None): the unigram count of the previous word (None if
+        there is no previous word, i.e. bigrams are not found).
+
+    return (float): the bound (infinity if MAX_UNIGRAM_COUNT is unknown).
+
+    """
+    if MAX_UNIGRAM_COUNT is None:
+        return float('inf')
+    bound = CHANNEL_PROBABILITIES[distance] * MAX_UNIGRAM_COUNT
+    if prev_count is not None:
+        bound *= prev_count ** 2
+    return bound
+
+
+def extend(word_prev, word, word_next, max_distance, stats=None,
+           words_prev=None):
+    """Return the candidates for word, each in the form
+    [w_prev, w, w_next, channel model probability].
+
+    word_prev (string|None): the previous word.
+    word (string): the word to be corrected.
+    word_next (string|None): the next word.
+    max_distance (int): the maximum edit distance of candidates.
+    stats (Counter): the counters of the request (optional).
+    words_prev (set|None): if given, the words the previous word can be,
+        whose successors are looked at instead of those of word_prev.
+
+    return (list): the candidates.
+
+    """
+    candidates = []
+    known_words = None
+    if CONTEXT is not None:
+        known_words = CONTEXT.candidates(
+            word_prev if words_prev is None else words_prev, word, word_next,
+            max_distance, CANDIDATES, stats)
+    if known_words is None:
+        known_words = CANDIDATES.candidates(word, max_distance, stats)
+
+    # Add the word itself with 1.0 prob, known words within edit distance 1
+    # with 10^-3 prob, known words within edit distance 2 with 10^-4 prob
+    # (and so on).
+    known_words[0] = known_words[0] | set([word])
+    for c_set, probability in zip(known_words, CHANNEL_PROBABILITIES):
+        candidates.append([c_set, probability])
 
     extended_candidates = []
 
@@ -111,57 +538,295 @@ def correct(word_prev, word, word_next):
             [[word_prev, candidate, word_next, probability]
                 for candidate in current_set])
 
-    # TODO REMOVE Display queries for debug purposes.
-    global queries
-    queries = 3 * len(extended_candidates)
+    return extended_candidates
 
-    # As the number of queries can be really high and we aim for efficiency,
-    # a critical aspect is the number of back-and-forth TCP packets between the
-    # client and the server. Redis instance can theoretically be in a different
-    # server; this adds some latency to every single query (in the order of
-    # tens of milliseconds) and leads to unacceptable global response times.
-    # By taking advantage of Redis pipelines, all the queries are initially
-    # buffered and then issued at once, dramatically increasing performances.
 
-    unigrams_pipe = UNIGRAMS_REDIS.pipeline(transaction=False)
-    bigrams_pipe = BIGRAMS_REDIS.pipeline(transaction=False)
+def correct(word_prev, word, word_next, stats=None, tiered=False):
+    correction = TYPOS.get(word)
+    if correction is not None:
+        if stats is not None:
+            stats['typos_hits'] += 1
+        return [word_prev, correction, word_next, CHANNEL_PROBABILITIES[1],
+                None]
 
-    for candidate in extended_candidates:
-        w_prev = candidate[0]
-        w = candidate[1]
-        w_next = candidate[2]
-        channel_model_p = candidate[3]
+    # In tiered mode, candidates farther than edit distance 1 are only
+    # considered if they could beat the best candidate found so far (as
+    # bounded for the 'product' scorer).
+    tiered = tiered and SCORER != 'log'
+    max_distance = min(MAX_DISTANCE, 1) if tiered else MAX_DISTANCE
+    extended_candidates = extend(word_prev, word, word_next, max_distance,
+                                 stats)
 
-        try:
-            unigrams_pipe.get(w)
-        except:
-            raise
+    # TODO REMOVE Display queries for debug purposes.
+    global queries
+    queries = 3 * len(extended_candidates)
 
+    if LUA_SCORER is not None and not tiered:
         try:
-            bigrams_pipe.get(w_prev + " " + w)
-        except:  # dummy value
-            bigrams_pipe.get("")
+            idx, probability = LUA_SCORER.best(extended_candidates, word_prev,
+                                               stats)
+        except redis.exceptions.RedisError:
+            if stats is not None:
+                stats['lua_fallbacks'] += 1
+        else:
+            best = extended_candidates[idx]
+            best.append(probability)
+            if stats is not None:
+                stats['tier%d' % CHANNEL_PROBABILITIES.index(best[3])] += 1
+            return best
+
+    lookup = None
+    if PRUNE:
+        extended_candidates, lookup = prune(extended_candidates, word_prev,
+                                            stats)
+
+    if SCORER == 'log':
+        best = score_log(extended_candidates, word_prev, stats, lookup)
+        if stats is not None:
+            stats['tier%d' % CHANNEL_PROBABILITIES.index(best[3])] += 1
+        return best
+
+    prev_count = score(extended_candidates, word_prev if tiered else None,
+                       stats, lookup)
+
+    # Choose the maximum (on the fifth parameter, i.e. the computed
+    # probability).
+    best = max(extended_candidates, key=lambda c: c[4])
+
+    for distance in range(max_distance + 1, MAX_DISTANCE + 1):
+        if best[4] >= tier_bound(distance, prev_count):
+            if stats is not None:
+                stats['tiered_early_exits'] += 1
+            break
+        extended = [[word_prev, candidate, word_next,
+                     CHANNEL_PROBABILITIES[distance]]
+                    for candidate in CANDIDATES.candidates(
+                        word, distance, stats)[distance]]
+        queries += 3 * len(extended)
+        score(extended, stats=stats)
+        extended_candidates.extend(extended)
+        best = max(extended_candidates, key=lambda c: c[4])
+
+    if stats is not None:
+        stats['tier%d' % CHANNEL_PROBABILITIES.index(best[3])] += 1
+    return best
+
+
+def segment(words, joinable, stats=None):
+    """Return the words of a sentence to be split or merged (see
+    segmentation.py), with one round trip per database if there is any
+    hypothesis.
+
+    words (list): the words of the sentence.
+    joinable (list): whether each word can be merged with the next one.
+    stats (Counter): the counters of the request (optional).
+
+    return (list): for each word, None if it is to be corrected, its split
+        or the merged word (and an empty string for the next one).
+
+    """
+    hypotheses = segmentation.Segmentation(words, joinable, CANDIDATES,
+                                           CHANNEL_PROBABILITIES[1])
+    if len(hypotheses) == 0:
+        return [None] * len(words)
+
+    # Kept words are represented by their candidates within distance 1, as
+    # in correct_sentence().
+    positions = []
+    for idx, word in enumerate(words):
+        word_next = words[idx + 1] if idx < len(words) - 1 else None
+        if word in TYPOS:
+            positions.append([[None, TYPOS[word], word_next,
+                               CHANNEL_PROBABILITIES[1]]])
+        else:
+            words_prev = set(c[1] for c in positions[-1]) if positions \
+                else None
+            positions.append(extend(None, word, word_next,
+                                    min(MAX_DISTANCE, 1), stats, words_prev))
+    position_words = [set(c[1] for c in extended_candidates)
+                      for extended_candidates in positions]
+
+    lookup = ngrams.Lookup(UNIGRAMS, BIGRAMS, stats)
+    for idx in range(len(positions)):
+        for w in position_words[idx]:
+            lookup.add_unigram(w)
+            if idx > 0:
+                for w_prev in position_words[idx - 1]:
+                    lookup.add_bigram(w_prev, w)
+    unigrams, bigrams = hypotheses.requests(position_words)
+    for w in unigrams:
+        lookup.add_unigram(w)
+    for w1, w2 in bigrams:
+        lookup.add_bigram(w1, w2)
+    lookup.fetch()
+    return hypotheses.best(positions, lookup, UNIGRAM_TOTAL, stats)
+
+
+def correct_sentence(words, stats=None, joinable=None):
+    """Correct a sentence with one round trip per database.
+
+    The result is the same as correcting each word from left to right with
+    correct(), where the previous word is the already corrected one. Since
+    it is not known in advance, the bigrams of every candidate of a word with
+    every candidate of the previous word are fetched, up to BATCH_MAX_KEYS
+    keys. With SEGMENTATION, the counts needed to split and merge words are
+    fetched in the same round trip. With CONTEXT, the candidates of a word
+    come from the successors of every candidate of the previous word, so
+    there may be more of them than correct() would consider.
+
+    words (list): the words of the sentence.
+    stats (Counter): the counters of the request (optional).
+    joinable (list|None): whether each word can be merged with the next one
+        (needed by SEGMENTATION).
+
+    return (list|None): the corrected words (a split word being its two
+        words separated by a space, a merged one being followed by an empty
+        string), or None if the sentence needs too many keys (correct()
+        should be used instead).
+
+    """
+    positions = []
+    for idx, word in enumerate(words):
+        word_next = words[idx + 1] if idx < len(words) - 1 else None
+        if word in TYPOS:
+            # The correction is the only candidate.
+            if stats is not None:
+                stats['typos_hits'] += 1
+            positions.append([[None, TYPOS[word], word_next,
+                               CHANNEL_PROBABILITIES[1]]])
+            continue
+        # The context of the word is the successors of every candidate of
+        # the previous one.
+        words_prev = set(c[1] for c in positions[-1]) if positions else None
+        positions.append(extend(None, word, word_next, MAX_DISTANCE, stats,
+                                words_prev))
+
+    # Every candidate needs its unigram and its bigrams with each candidate
+    # of the previous word.
+    position_words = [set(c[1] for c in extended_candidates)
+                      for extended_candidates in positions]
+    keys = sum(len(extended_candidates) for extended_candidates in positions)
+    for idx in range(1, len(positions)):
+        keys += 2 * len(position_words[idx - 1]) * len(position_words[idx])
+
+    hypotheses = None
+    if SEGMENTATION and joinable is not None:
+        hypotheses = segmentation.Segmentation(words, joinable, CANDIDATES,
+                                               CHANNEL_PROBABILITIES[1])
+    if hypotheses is not None and len(hypotheses) > 0:
+        # The words following a split or merged word are corrected given its
+        # last word, so its bigrams with all of their candidates are needed,
+        # not only with those within distance 1 that segment() compares.
+        unigrams, bigrams = hypotheses.requests(position_words)
+        keys += len(unigrams) + len(bigrams)
+    else:
+        hypotheses = None
+    if keys > BATCH_MAX_KEYS:
+        if stats is not None:
+            stats['batch_fallbacks'] += 1
+        return None
+
+    lookup = ngrams.Lookup(UNIGRAMS, BIGRAMS, stats)
+    for idx, extended_candidates in enumerate(positions):
+        for candidate in extended_candidates:
+            lookup.add_unigram(candidate[1])
+        if idx == 0:
+            continue
+        for w_prev in position_words[idx - 1]:
+            for w in position_words[idx]:
+                lookup.add_bigram(w_prev, w)
+                lookup.add_bigram(w, w_prev)
+
+    if hypotheses is not None:
+        for w in unigrams:
+            lookup.add_unigram(w)
+        for w1, w2 in bigrams:
+            lookup.add_bigram(w1, w2)
 
-        try:
-            bigrams_pipe.get(w + " " + w_prev)
-        except:  # dummy value
-            bigrams_pipe.get("")
+    global queries
+    queries = keys
 
-    # Execute pipelines in a single command.
-    unigrams_values = unigrams_pipe.execute()
-    bigrams_values = bigrams_pipe.execute()
+    # Send every lookup of the sentence at once, one round trip per
+    # database.
+    lookup.fetch()
 
-    # Compute the probability for each candidate.
-    for idx, candidate in enumerate(extended_candidates):
-        p1 = unigrams_values[idx] or 1.0
-        p2 = bigrams_values[2 * idx] or 1.0
-        p3 = bigrams_values[2 * idx + 1] or 1.0
-        p4 = candidate[3]
-        candidate.append(int(p1) * int(p2) * int(p3) * p4)
+    outputs = [None] * len(positions)
+    if hypotheses is not None:
+        outputs = hypotheses.best(
+            [[c for c in extended_candidates
+              if c[3] >= CHANNEL_PROBABILITIES[1]]
+             for extended_candidates in positions],
+            lookup, UNIGRAM_TOTAL, stats)
 
-    # Return the maximum (choosing on the fifth parameter, i.e. the
-    # computed probability).
-    return max(extended_candidates, key=lambda c: c[4])
+    def probability(word_prev, candidate):
+        w = candidate[1]
+        p1 = lookup.unigram(w) or 1.0
+        p2 = lookup.bigram(word_prev, w) or 1.0
+        p3 = lookup.bigram(w, word_prev) or 1.0
+        p4 = candidate[3]
+        return int(p1) * int(p2) * int(p3) * p4
+
+    def scores(word_prev, extended_candidates):
+        # The score of each candidate, as correct() computes it.
+        if SCORER == 'log':
+            return log_probabilities(word_prev, extended_candidates, lookup)
+        return [probability(word_prev, c) for c in extended_candidates]
+
+    def log_scores(word_prev, extended_candidates):
+        if SCORER == 'log':
+            return scores(word_prev, extended_candidates)
+        return [math.log(p) for p in scores(word_prev, extended_candidates)]
+
+    if DECODER == 'beam':
+        # Decode the runs of words between those split or merged, whose
+        # corrections are known.
+        corrected = list(outputs)
+        runs = [[]]
+        words_prev = [None]
+        for idx, output in enumerate(outputs):
+            if output is None:
+                runs[-1].append(idx)
+            else:
+                runs.append([])
+                words_prev.append(output.split(" ")[-1] if output
+                                  else words_prev[-1])
+        if PRUNE:
+            # The previous word of a candidate depends on the path.
+            positions = [prune(extended_candidates, stats=stats,
+                               lookup=lookup, any_prev=True)[0]
+                         for extended_candidates in positions]
+        for run, word_prev in zip(runs, words_prev):
+            path = beam.decode([positions[idx] for idx in run], log_scores,
+                               BEAM_WIDTH, word_prev, stats)
+            for idx, best in zip(run, path):
+                if stats is not None:
+                    stats['tier%d' % CHANNEL_PROBABILITIES.index(best[3])] \
+                        += 1
+                corrected[idx] = best[1]
+        return corrected
+
+    # Score locally, from left to right, exactly as correct() does.
+    corrected = []
+    word_prev = None
+    for extended_candidates, output in zip(positions, outputs):
+        if output is not None:
+            corrected.append(output)
+            if output:
+                word_prev = output.split(" ")[-1]
+            continue
+        if PRUNE:
+            extended_candidates = prune(extended_candidates, word_prev,
+                                        stats, lookup)[0]
+        for candidate, p in zip(extended_candidates,
+                                scores(word_prev, extended_candidates)):
+            candidate[0] = word_prev
+            candidate.append(p)
+        best = max(extended_candidates, key=lambda c: c[4])
+        if stats is not None:
+            stats['tier%d' % CHANNEL_PROBABILITIES.index(best[3])] += 1
+        word_prev = best[1]
+        corrected.append(word_prev)
+    return corrected
 
 
 class Index(flask_restful.Resource):
@@ -169,39 +834,132 @@ class Index(flask_restful.Resource):
         return app.send_static_file('index.html')
 
 class Corrector(flask_restful.Resource):
-    def parse(self, words_str):
-        words = words_str.split()
-        res = ""
-        if len(words) == 1:
-            res = correct(None, words[0], None)[1]
+    def parse(self, words_str, stats=None, tiered=False, batch=False):
+        # Only words are corrected, without the punctuation around them;
+        # numbers, URLs and the like are passed through.
+        tokens = [tokenizer.classify(t) for t in words_str.split()]
+        typed = [core for kind, _, core, _ in tokens
+                 if kind == tokenizer.WORD]
+        if stats is not None:
+            for kind, lead, _, trail in tokens:
+                if kind != tokenizer.WORD:
+                    stats['tokens_bypassed'] += 1
+                    stats['tokens_bypassed_' + kind] += 1
+                elif lead or trail:
+                    stats['tokens_peeled'] += 1
+        # Words are normalized as computeFrequencies.py made the keys (so they
+        # are lowercase): correct them, then give the corrections the casing
+        # of the input.
+        words = [normalize.normalize(w) for w in typed]
+        # Elided words are corrected on their own, then joined back to the
+        # word they precede; sizes tells how many words each token became.
+        sizes = [1] * len(words)
+        if SPLIT_ELISIONS:
+            split_typed = []
+            split_words = []
+            for idx, (t, w) in enumerate(zip(typed, words)):
+                parts = normalize.split_elision(w)
+                typed_parts = normalize.split_elision(t)
+                if len(typed_parts) != len(parts):
+                    # Only if normalization removed something around the
+                    # apostrophe: the casing of the input is lost.
+                    typed_parts = parts
+                split_typed.extend(typed_parts)
+                split_words.extend(parts)
+                sizes[idx] = len(parts)
+                if stats is not None and len(parts) > 1:
+                    stats['elisions_split'] += 1
+            typed = split_typed
+            words = split_words
+        folded = list(words)
+        if stats is not None:
+            for t, w in zip(typed, folded):
+                if t != w:
+                    stats['case_folded'] += 1
+                    # As typed, the word would have been expanded as an
+                    # unknown one, and all its keys would have been missing.
+                    if t not in WORDS and w in WORDS:
+                        stats['case_expansions_avoided'] += 1
+        # Words can only be merged with the next one if both are whole
+        # tokens, with no punctuation nor other tokens between them.
+        joinable = None
+        if SEGMENTATION:
+            joinable = []
+            word_tokens = [idx for idx, token in enumerate(tokens)
+                           if token[0] == tokenizer.WORD]
+            for k, idx in enumerate(word_tokens):
+                joinable.extend([False] * (sizes[k] - 1))
+                joinable.append(k < len(word_tokens) - 1 and
+                                word_tokens[k + 1] == idx + 1 and
+                                sizes[k] == 1 and sizes[k + 1] == 1 and
+                                not tokens[idx][3] and not tokens[idx + 1][1])
+        corrected = correct_sentence(words, stats, joinable) \
+            if batch or DECODER == 'beam' else None
+        if corrected is not None:
+            words = corrected
         else:
-            print words
-            for idx in range(len(words)):
-                if idx < 1:
-                    words[idx] = correct(None, words[idx], words[idx + 1])[1]
-                elif idx < len(words) - 1:
-                    words[idx] = correct(words[idx - 1], words[idx],
-                                         words[idx + 1])[1]
-                else:
-                    words[idx] = correct(words[idx - 1], words[idx], None)[1]
-            str = ""
+            # Words split or merged are not corrected any further.
+            fixed = [None] * len(words)
+            if SEGMENTATION:
+                fixed = segment(words, joinable, stats)
+            if len(words) > 1:
+                print words
+            word_prev = None
             for idx in range(len(words)):
-                str += words[idx] + " "
-            res = str[:-1]
+                if fixed[idx] is not None:
+                    words[idx] = fixed[idx]
+                    if fixed[idx]:
+                        word_prev = fixed[idx].split(" ")[-1]
+                    continue
+                word_next = None
+                if idx < len(words) - 1:
+                    word_next = (fixed[idx + 1] or
+                                 words[idx + 1]).split(" ")[0]
+                words[idx] = correct(word_prev, words[idx], word_next,
+                                     stats, tiered)[1]
+                word_prev = words[idx]
+        corrected = iter(casing.restore(t, f, w)
+                         for t, f, w in zip(typed, folded, words))
+        str = ""
+        sizes = iter(sizes)
+        for kind, lead, core, trail in tokens:
+            if kind == tokenizer.WORD:
+                core = "".join(next(corrected) for _ in range(next(sizes)))
+                if not core:
+                    # Merged into the previous word.
+                    str = str[:-1] + trail + " "
+                    continue
+            str += lead + core + trail + " "
+        res = str[:-1]
 
         return {'input': words_str,
                 'corrected': res}
 
     def get(self, words_str):
         begin_time = datetime.datetime.now()
+        tiered = request.args.get('tiered', '1' if TIERED else '0') == '1'
+        batch = request.args.get('batch', '1' if BATCH else '0') == '1'
         # Try to save resources and reduce response time retrieving
-        # the answer from cache.
-        res = memcache.get(words_str)
+        # the answer from cache. Tiered and batched modes can give different
+        # corrections (tiered bounds, beam search, pruning, fallbacks of
+        # sentences with too many keys), so each mode has its own entries.
+        key = u"%d%d %s" % (tiered, batch, words_str)
+        res = memcache.get(key)
         if res is None:
-            res = self.parse(words_str)
+            stats = collections.Counter()
+            res = self.parse(words_str, stats, tiered, batch)
             res['cache'] = False
             res['queries'] = queries
-            memcache.add(words_str, res, 86400)
+            res['stats'] = dict(stats)
+            if stats['prune_candidates'] > 0:
+                res['stats']['prune_ratio'] = \
+                    1 - stats['prune_kept'] / stats['prune_candidates']
+            context_lookups = stats['context_hits'] + \
+                stats['context_fallbacks']
+            if context_lookups > 0:
+                res['stats']['context_hit_rate'] = \
+                    stats['context_hits'] / context_lookups
+            memcache.add(key, res, 86400)
         else:
             res['cache'] = True
 
@@ -0,0 +1,185 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Precomputed graph of the dictionary neighbors of frequent words.
+
+Words that are already correct (or real-word errors, such as "anno" for
+"hanno") are still expanded to distance 2, which is the most expensive
+case. The graph stores, for the most frequent words, the candidates within
+distance 1 and 2 as indices in a word table, so that their generation is a
+single adjacency read.
+
+The file is made of (integers are little-endian unsigned 32 bits):
+- the magic string MAGIC (8 bytes);
+- the number N of words and the number M of heads (words with neighbors);
+- N words, each one as its length (16 bits) followed by its UTF-8 bytes;
+- M heads, in decreasing order of frequency, each one as its index, the
+  number n1 of words within distance 1, the number n2 of words at distance
+  2, then the n1 + n2 indices.
+
+"""
+
+import struct
+import sys
+import threading
+
+from array import array
+
+MAGIC = b'NEIGHB01'
+_INT = struct.Struct('<I')
+_LENGTH = struct.Struct('<H')
+_HEAD = struct.Struct('<3I')
+
+# Rough memory cost of each stored word and head besides its data (object
+# headers, dictionary entry, array and tuple), in bytes.
+_WORD_OVERHEAD = 80
+_HEAD_OVERHEAD = 200
+
+
+def write(path, words, heads):
+    """Write a graph.
+
+    path (string): the path of the file.
+    words (list): the word table.
+    heads (list): the (index, within 1, at distance 2) triples, the last two
+        being lists of indices in words.
+
+    """
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_INT.pack(len(words)))
+        f.write(_INT.pack(len(heads)))
+        for w in words:
+            data = w.encode('utf8')
+            f.write(_LENGTH.pack(len(data)))
+            f.write(data)
+        for idx, within1, at2 in heads:
+            f.write(_HEAD.pack(idx, len(within1), len(at2)))
+            f.write(struct.pack('<%dI' % (len(within1) + len(at2)),
+                                *(within1 + at2)))
+
+
+class NeighborGraph(object):
+    """Candidate generator reading the neighbors of frequent words from a
+    graph and asking another generator for every other word.
+
+    The graph is only loaded by the first lookup, and only as many heads as
+    fit in the memory budget (the most frequent ones), with the words they
+    reference, are kept.
+
+    """
+
+    def __init__(self, path, fallback, budget=64 * 2 ** 20):
+        """Initialize the generator.
+
+        path (string): the path of the graph, written by write().
+        fallback (object): the candidate generator for the other words.
+        budget (int): the maximum memory used by the graph, in bytes.
+
+        """
+        self.path = path
+        self.fallback = fallback
+        self.budget = budget
+        self._words = None
+        self._adjacency = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._adjacency is not None:
+                return
+            # Words are only decoded if a head kept references them, so that
+            # the budget covers the word table too: its offsets are noted
+            # first, and the words read once the heads are chosen.
+            offsets = array('L')
+            lengths = array('H')
+            words = {}
+            adjacency = {}
+            used = 0
+            with open(self.path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError("%s is not a neighbor graph."
+                                     % self.path)
+                n = _INT.unpack(f.read(_INT.size))[0]
+                m = _INT.unpack(f.read(_INT.size))[0]
+                for _ in range(n):
+                    length = _LENGTH.unpack(f.read(_LENGTH.size))[0]
+                    offsets.append(f.tell())
+                    lengths.append(length)
+                    f.seek(length, 1)
+                for _ in range(m):
+                    idx, n1, n2 = _HEAD.unpack(f.read(_HEAD.size))
+                    neighbors = array('I', f.read(4 * (n1 + n2)))
+                    if sys.byteorder == 'big':
+                        neighbors.byteswap()
+                    new = set(i for i in neighbors if i not in words)
+                    if idx not in words:
+                        new.add(idx)
+                    cost = 4 * (n1 + n2) + _HEAD_OVERHEAD + \
+                        sum(lengths[i] + _WORD_OVERHEAD for i in new)
+                    if used + cost > self.budget:
+                        break
+                    used += cost
+                    words.update(dict.fromkeys(new))
+                    adjacency[idx] = (n1, neighbors)
+                for i in sorted(words):
+                    f.seek(offsets[i])
+                    words[i] = f.read(lengths[i]).decode('utf8')
+            self._words = words
+            self._adjacency = dict((words[idx], entry)
+                                   for idx, entry in adjacency.items())
+
+    def __contains__(self, word):
+        return word in self.fallback
+
+    def __len__(self):
+        return len(self.fallback)
+
+    def candidates(self, word, max_distance=2, stats=None):
+        """Return the known words within max_distance from word, grouped by
+        distance.
+
+        word (string): the (possibly misspelled) word.
+        max_distance (int): the maximum distance.
+        stats (Counter): if given, the number of words read from the graph
+            ('neighbors_hits') and generated by the fallback
+            ('neighbors_misses') are added to it.
+
+        return (list): a list of max_distance + 1 sets, the i-th one
+            containing the known words within distance i.
+
+        """
+        if max_distance <= 2:
+            if self._adjacency is None:
+                self._load()
+            entry = self._adjacency.get(word)
+            if entry is not None:
+                if stats is not None:
+                    stats['neighbors_hits'] += 1
+                n1, neighbors = entry
+                res = [set([word])]
+                if max_distance >= 1:
+                    res.append(set(self._words[i] for i in neighbors[:n1]))
+                if max_distance >= 2:
+                    res.append(res[1] |
+                               set(self._words[i] for i in neighbors[n1:]))
+                return res
+        if stats is not None:
+            stats['neighbors_misses'] += 1
+        return self.fallback.candidates(word, max_distance, stats)
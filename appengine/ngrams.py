@@ -0,0 +1,358 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Lookup layer for unigram and bigram counts.
+
+A Lookup collects the keys needed by a request, fetches each distinct key
+once and maps the values back. Counts live in stores, objects exposing a
+single method, mget(keys, stats=None), which returns the values (None for
+missing keys) in the same order with one round trip. Stores can wrap other
+stores (e.g. CachedStore).
+
+"""
+
+import collections
+import threading
+import time
+import zlib
+
+# Prefixes of the names of hash buckets (see HashStore) and of the per-word
+# bigram hashes (see WordHashStore), bytes that never occur in UTF-8, so
+# that they can't clash with plain keys.
+BUCKET_PREFIX = b'\xfe'
+LEFT_PREFIX = b'\xfc'
+RIGHT_PREFIX = b'\xfd'
+
+
+def bigram_key(w1, w2):
+    """Return the key of the bigram (w1, w2), None if a word is missing.
+
+    """
+    if w1 is None or w2 is None:
+        return None
+    return w1 + " " + w2
+
+
+class RedisStore(object):
+    """Store backed by a Redis database.
+
+    Keys are fetched with MGET commands of at most chunk_size keys each (so
+    that a single huge request does not block Redis for too long), all sent
+    in the same pipeline.
+
+    """
+
+    def __init__(self, redis, chunk_size=1000):
+        """Initialize the store.
+
+        redis (redis.client.StrictRedis): an established connection to a
+            Redis instance.
+        chunk_size (int): the maximum number of keys of each MGET.
+
+        """
+        self.redis = redis
+        self.chunk_size = chunk_size
+
+    def mget(self, keys, stats=None):
+        if not keys:
+            return []
+        pipe = self.redis.pipeline(transaction=False)
+        for idx in range(0, len(keys), self.chunk_size):
+            pipe.mget(keys[idx:idx + self.chunk_size])
+        values = []
+        for chunk in pipe.execute():
+            values.extend(chunk)
+        return values
+
+
+def bucket(key, buckets):
+    """Return the name of the hash bucket holding key.
+
+    key (string|bytes): the key (unicode strings are encoded in UTF-8).
+    buckets (int): the number of buckets.
+
+    return (bytes): the name of the bucket.
+
+    """
+    if not isinstance(key, bytes):
+        key = key.encode('utf8')
+    return BUCKET_PREFIX + str((zlib.crc32(key) & 0xffffffff) %
+                               buckets).encode('ascii')
+
+
+class HashStore(object):
+    """Store backed by a Redis database where keys are grouped into hashes.
+
+    Every top-level Redis key costs dozens of bytes of overhead, more than
+    a typical n-gram and its count. Here each key is a field of one of
+    buckets hashes (see bucket()); as long as hashes stay small (below
+    hash-max-ziplist-entries fields, 128 by default) Redis stores them in
+    its compact ziplist encoding. Keys are fetched with one HMGET per
+    bucket, all sent in the same pipeline.
+
+    """
+
+    def __init__(self, redis, buckets):
+        """Initialize the store.
+
+        redis (redis.client.StrictRedis): an established connection to a
+            Redis instance.
+        buckets (int): the number of buckets the keys were loaded into.
+
+        """
+        self.redis = redis
+        self.buckets = buckets
+
+    def mget(self, keys, stats=None):
+        if not keys:
+            return []
+        fields = collections.OrderedDict()
+        for idx, key in enumerate(keys):
+            fields.setdefault(bucket(key, self.buckets), []).append(idx)
+        pipe = self.redis.pipeline(transaction=False)
+        for name, idxs in fields.items():
+            pipe.hmget(name, [keys[idx] for idx in idxs])
+        values = [None] * len(keys)
+        for idxs, chunk in zip(fields.values(), pipe.execute()):
+            for idx, value in zip(idxs, chunk):
+                values[idx] = value
+        return values
+
+
+def word_hash(key, right=False):
+    """Return where the bigram key is stored in the per-word layout.
+
+    key (string): the bigram key, "w1 w2".
+    right (bool): whether to use the layout keyed by the right word (w2,
+        field w1) instead of the one keyed by the left word (w1, field w2).
+
+    return ((bytes, string)): the name of the hash and the field.
+
+    """
+    w1, w2 = key.split(' ', 1)
+    if right:
+        return RIGHT_PREFIX + w2.encode('utf8'), w1
+    return LEFT_PREFIX + w1.encode('utf8'), w2
+
+
+class WordHashStore(object):
+    """Store of bigrams backed by a Redis database where bigrams are grouped
+    by one of their words.
+
+    In the left layout the bigram "w1 w2" is the field w2 of the hash of w1,
+    in the right (mirror) layout it's the field w1 of the hash of w2. The
+    bigrams of a word with all the candidates of the next (or previous)
+    position share a hash, so they come back with a single HMGET. When both
+    layouts are loaded, each key is looked up in the hash shared by most of
+    the keys requested.
+
+    """
+
+    def __init__(self, redis, layout='left', chunk_size=1000):
+        """Initialize the store.
+
+        redis (redis.client.StrictRedis): an established connection to a
+            Redis instance.
+        layout (string): the layouts loaded, 'left', 'right' or 'both'.
+        chunk_size (int): the maximum number of fields of each HMGET.
+
+        """
+        if layout not in ('left', 'right', 'both'):
+            raise ValueError("Unknown bigram layout %s." % layout)
+        self.redis = redis
+        self.layout = layout
+        self.chunk_size = chunk_size
+
+    def mget(self, keys, stats=None):
+        if not keys:
+            return []
+        pairs = [k.split(' ', 1) for k in keys]
+        if self.layout == 'both':
+            lefts = collections.Counter(w1 for w1, _ in pairs)
+            rights = collections.Counter(w2 for _, w2 in pairs)
+            sides = [rights[w2] > lefts[w1] for w1, w2 in pairs]
+        else:
+            sides = [self.layout == 'right'] * len(keys)
+
+        hashes = collections.OrderedDict()
+        for idx, (key, right) in enumerate(zip(keys, sides)):
+            name, field = word_hash(key, right)
+            hashes.setdefault(name, []).append((idx, field))
+        pipe = self.redis.pipeline(transaction=False)
+        chunks = []
+        for name, fields in hashes.items():
+            for start in range(0, len(fields), self.chunk_size):
+                chunk = fields[start:start + self.chunk_size]
+                pipe.hmget(name, [field for _, field in chunk])
+                chunks.append(chunk)
+        values = [None] * len(keys)
+        for chunk, res in zip(chunks, pipe.execute()):
+            for (idx, _), value in zip(chunk, res):
+                values[idx] = value
+        return values
+
+
+class CachedStore(object):
+    """Process-local, read-through LRU cache in front of another store.
+
+    Following Zipf's law, a few keys get most of the lookups, so even a
+    small cache saves most of the traffic. Missing keys are cached too (as
+    None), as most bigrams of the candidates do not exist. Entries expire
+    after ttl seconds, so that updates of the counts eventually show up.
+
+    The cache is thread-safe; the lock is not held while the wrapped store is
+    queried.
+
+    """
+
+    def __init__(self, store, size=100000, ttl=3600, name='cache'):
+        """Initialize the cache.
+
+        store (object): the wrapped store.
+        size (int): the maximum number of cached keys.
+        ttl (int): the time to live of each entry, in seconds.
+        name (string): the prefix of the counters added to stats.
+
+        """
+        self.store = store
+        self.size = size
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def mget(self, keys, stats=None):
+        now = time.time()
+        values = [None] * len(keys)
+        missing = []
+        with self._lock:
+            for idx, key in enumerate(keys):
+                entry = self._entries.pop(key, None)
+                if entry is not None and entry[1] > now:
+                    # Move the entry to the end (most recently used).
+                    self._entries[key] = entry
+                    values[idx] = entry[0]
+                else:
+                    missing.append(idx)
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        if stats is not None:
+            stats[self.name + '_hits'] += len(keys) - len(missing)
+            stats[self.name + '_misses'] += len(missing)
+
+        if missing:
+            fetched = self.store.mget([keys[idx] for idx in missing], stats)
+            expires = time.time() + self.ttl
+            with self._lock:
+                for idx, value in zip(missing, fetched):
+                    values[idx] = value
+                    self._entries.pop(keys[idx], None)
+                    self._entries[keys[idx]] = (value, expires)
+                # Evict the least recently used entries.
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return values
+
+
+class Lookup(object):
+    """Deduplicated lookup of the counts needed by a request.
+
+    Request every key with add_unigram() and add_bigram(), call fetch()
+    once, then read the values with unigram() and bigram().
+
+    """
+
+    def __init__(self, unigrams_store, bigrams_store, stats=None):
+        """Initialize the lookup.
+
+        unigrams_store (object): the store of unigram counts.
+        bigrams_store (object): the store of bigram counts.
+        stats (Counter): if given, the number of keys requested
+            ('keys_requested') and actually fetched ('keys_fetched') are
+            added to it.
+
+        """
+        self._stores = (unigrams_store, bigrams_store)
+        self._values = ({}, {})
+        self._pending = ([], [])
+        self._stats = stats
+
+    def _add(self, kind, key):
+        if key is None:
+            return
+        if self._stats is not None:
+            self._stats['keys_requested'] += 1
+        if key not in self._values[kind]:
+            self._values[kind][key] = None
+            self._pending[kind].append(key)
+
+    def add_unigram(self, w):
+        """Request the count of w.
+
+        w (string): the word.
+
+        """
+        self._add(0, w)
+
+    def add_bigram(self, w1, w2):
+        """Request the count of the bigram (w1, w2).
+
+        w1 (string|None): the first word (None means no bigram at all).
+        w2 (string|None): the second word (None means no bigram at all).
+
+        """
+        self._add(1, bigram_key(w1, w2))
+
+    def fetch(self):
+        """Fetch every pending key, with one round trip per store.
+
+        """
+        for kind in range(2):
+            keys = self._pending[kind]
+            if not keys:
+                continue
+            if self._stats is not None:
+                self._stats['keys_fetched'] += len(keys)
+            values = self._stores[kind].mget(keys, self._stats)
+            self._values[kind].update(zip(keys, values))
+            self._pending[kind][:] = []
+
+    def unigram(self, w):
+        """Return the count of w (None if unknown or not fetched yet).
+
+        w (string): the word.
+
+        return (string|None): the count.
+
+        """
+        return self._values[0].get(w)
+
+    def bigram(self, w1, w2):
+        """Return the count of the bigram (w1, w2) (None if unknown or not
+        fetched yet).
+
+        w1 (string|None): the first word.
+        w2 (string|None): the second word.
+
+        return (string|None): the count.
+
+        """
+        return self._values[1].get(bigram_key(w1, w2))
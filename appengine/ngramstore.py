@@ -0,0 +1,120 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Immutable, memory-mapped store of n-gram counts.
+
+The file is made of (all integers are little-endian unsigned 64 bits):
+- the magic string MAGIC (8 bytes);
+- the number N of keys;
+- N + 1 offsets: key i spans bytes offsets[i] ... offsets[i + 1] of the blob;
+- N counts;
+- the blob: every key encoded in UTF-8, sorted bytewise.
+
+Lookups are binary searches over the mapped file, so no parsing happens at
+start-up and every process mapping the same file shares one copy of it
+through the page cache.
+
+"""
+
+import mmap
+import struct
+
+MAGIC = b'NGRAMS01'
+_INT = struct.Struct('<Q')
+
+
+def _encode(key):
+    return key if isinstance(key, bytes) else key.encode('utf8')
+
+
+def write(path, items):
+    """Write a store.
+
+    path (string): the path of the file.
+    items (iterable): the (key, count) pairs, keys being unicode strings
+        (encoded in UTF-8) or bytes (e.g. packed bigram keys, see wordids).
+
+    """
+    items = sorted((_encode(k), c) for k, c in items)
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_INT.pack(len(items)))
+        offset = 0
+        f.write(_INT.pack(offset))
+        for k, _ in items:
+            offset += len(k)
+            f.write(_INT.pack(offset))
+        for _, c in items:
+            f.write(_INT.pack(c))
+        for k, _ in items:
+            f.write(k)
+
+
+class NGramStore(object):
+    """Store (see ngrams) backed by a memory-mapped file written by write().
+
+    """
+
+    def __init__(self, path):
+        """Map the file.
+
+        path (string): the path of the file.
+
+        """
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError("%s is not an n-gram store." % path)
+        self._size = _INT.unpack_from(self._map, len(MAGIC))[0]
+        self._offsets = len(MAGIC) + _INT.size
+        self._counts = self._offsets + (self._size + 1) * _INT.size
+        self._blob = self._counts + self._size * _INT.size
+
+    def __len__(self):
+        return self._size
+
+    def _key(self, idx):
+        start, end = struct.unpack_from(
+            '<2Q', self._map, self._offsets + idx * _INT.size)
+        return self._map[self._blob + start:self._blob + end]
+
+    def get(self, key):
+        """Return the count of key (None if missing).
+
+        key (string|bytes): the key.
+
+        return (int|None): the count.
+
+        """
+        key = _encode(key)
+        lo = 0
+        hi = self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._size and self._key(lo) == key:
+            return _INT.unpack_from(self._map,
+                                    self._counts + lo * _INT.size)[0]
+        return None
+
+    def mget(self, keys, stats=None):
+        return [self.get(k) for k in keys]
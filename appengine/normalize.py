@@ -0,0 +1,82 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Normalization of words, shared by computeFrequencies.py (which builds the
+keys) and the API (which looks them up), so that keys match by construction.
+
+A word is normalized by removing the characters in EXCLUDE, turning
+typographic apostrophes into plain ones (both with a single translate()
+call) and lowercasing it. It is a valid key if it is not longer than
+MAX_LENGTH and has at least a character other than digits, spaces and
+!"#$%&'()*+,-./ (so numbers and dates are not).
+
+Italian elides articles, prepositions and a few other words before vowels
+("dell'anno", "l'albero", "un'altra"). Counted as they are, such tokens
+multiply the vocabulary by the number of elided forms in front of each word;
+split_elision() separates the elided word, so that both are counted (and
+corrected) on their own.
+
+"""
+
+import re
+
+EXCLUDE = u'"!(),.:;?[]{}“”«»'
+MAX_LENGTH = 50
+
+_TABLE = dict((ord(c), None) for c in EXCLUDE)
+_TABLE[ord(u'’')] = u"'"
+_VALID = re.compile(r'[^0-9 -/]')
+
+# Elided words, without the apostrophe: articles, articulated prepositions,
+# "di", "ci", "ne" and the like, and adjectives.
+ELISIONS = (
+    u'l', u'gl', u'un', u'dell', u'all', u'dall', u'nell', u'sull', u'coll',
+    u'pell', u'd', u'c', u'm', u't', u's', u'v', u'n', u'quest', u'quell',
+    u'bell', u'buon', u'sant', u'nessun', u'ciascun', u'alcun', u'qualcun')
+_ELISION = re.compile(u"(?:%s)['’](?=[^\\W\\d_])" % u'|'.join(ELISIONS),
+                      re.UNICODE | re.IGNORECASE)
+
+
+def normalize(word):
+    """Return the key of word.
+
+    word (string): the word.
+
+    return (string|None): the normalized word, None if it's not a valid key.
+
+    """
+    word = word.translate(_TABLE).lower()
+    if len(word) > MAX_LENGTH or _VALID.search(word) is None:
+        return None
+    return word
+
+
+def split_elision(word):
+    """Split the elided word at the beginning of word, if any.
+
+    word (string): the word, normalized or as typed.
+
+    return (list): the elided word, with its apostrophe, and the rest of word
+        ("dell'", "anno"), or just word.
+
+    """
+    m = _ELISION.match(word)
+    if m is None:
+        return [word]
+    return [word[:m.end()], word[m.end():]]
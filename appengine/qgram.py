@@ -0,0 +1,233 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Candidate generation with a character q-gram inverted index.
+
+Every word is padded with q - 1 '\\0' on both sides and indexed by its
+q-grams. A single edit destroys at most q + 1 of them (q for insertions,
+deletions and replacements, q + 1 for transpositions), so a word within
+distance k from the query shares at least max(len) + q - 1 - k * (q + 1)
+q-grams with it (count filtering) and differs in length by at most k (length
+filtering). The few words passing both filters are verified with Hyyrö's
+extension of Myers' bit-parallel edit distance, which also counts adjacent
+transpositions as one edit.
+
+The bit-parallel algorithm computes optimal string alignment distances, so
+words are verified up to edits.aligned_bound() and their distances then
+corrected with edits.exact_distance().
+
+"""
+
+import collections
+
+from array import array
+
+from edits import aligned_bound, exact_distance, group
+
+PAD = u'\0'
+
+
+def qgrams(word, q):
+    """Return the q-grams of word, padded on both sides.
+
+    word (string): the word to be processed.
+    q (int): the length of the grams.
+
+    return (list): the q-grams, in order (duplicates included).
+
+    """
+    padded = PAD * (q - 1) + word + PAD * (q - 1)
+    return [padded[i:i + q] for i in range(len(padded) - q + 1)]
+
+
+def myers(pattern, text):
+    """Return the optimal string alignment distance (Levenshtein plus
+    adjacent transpositions) between pattern and text, computed with Myers'
+    bit-parallel algorithm as extended by Hyyrö (one pass over text, each
+    column of the dynamic programming matrix being a couple of bit vectors).
+
+    pattern (string): the first string.
+    text (string): the second string.
+
+    return (int): the distance.
+
+    """
+    m = len(pattern)
+    if m == 0:
+        return len(text)
+    peq = {}
+    for i, c in enumerate(pattern):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    return _myers(peq, m, text)
+
+
+def _myers(peq, m, text):
+    """Run Myers' algorithm (with transpositions) with a precomputed
+    pattern bitmap.
+
+    peq (dict): maps each letter of the pattern to the bit vector of the
+        positions where it occurs.
+    m (int): the length of the pattern (at least 1).
+    text (string): the second string.
+
+    return (int): the distance.
+
+    """
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = full
+    mv = 0
+    d0 = 0
+    eq_prev = 0
+    score = m
+    for c in text:
+        eq = peq.get(c, 0)
+        # Diagonal zeros coming from a transposition of the previous
+        # letter and this one.
+        tr = (((~d0) & eq) << 1) & eq_prev
+        d0 = ((((eq & pv) + pv) & full) ^ pv) | eq | mv | tr
+        ph = mv | (~(d0 | pv) & full)
+        mh = pv & d0
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(d0 | ph) & full)
+        mv = ph & d0
+        eq_prev = eq
+    return score
+
+
+class QGramIndex(object):
+    """Candidate generator backed by a q-gram inverted index.
+
+    Distances are Damerau-Levenshtein distances, as in bktree.
+
+    """
+
+    def __init__(self, words, q=2):
+        """Build the index.
+
+        words (iterable): the dictionary.
+        q (int): the length of the grams (2 or 3 are sensible choices).
+
+        """
+        self.q = q
+        self._words = []
+        self._ids = {}
+        self._postings = {}
+        self._by_length = collections.defaultdict(lambda: array('i'))
+        for w in words:
+            if w in self._ids:
+                continue
+            idx = len(self._words)
+            self._words.append(w)
+            self._ids[w] = idx
+            self._by_length[len(w)].append(idx)
+            for g in qgrams(w, q):
+                if g not in self._postings:
+                    self._postings[g] = array('i')
+                self._postings[g].append(idx)
+
+    def __contains__(self, word):
+        return word in self._ids
+
+    def __len__(self):
+        return len(self._words)
+
+    def search(self, word, max_distance):
+        """Return every word within max_distance from word.
+
+        word (string): the (possibly misspelled) word.
+        max_distance (int): the maximum distance.
+
+        return ((dict, int)): the words found, mapped to their distance
+            from word, and the number of verified words.
+
+        """
+        n = len(word)
+        grams = collections.Counter(qgrams(word, self.q))
+
+        # The threshold depends on the length of the candidate: use the
+        # lowest one (the shortest candidate) to gather them, then check the
+        # actual threshold of each.
+        min_shared = max(n - max_distance, 0) + self.q - 1 - \
+            max_distance * (self.q + 1)
+        if min_shared > 0:
+            shared = collections.Counter()
+            for g, count in grams.items():
+                posting = self._postings.get(g)
+                if posting is None:
+                    continue
+                if count == 1:
+                    shared.update(posting)
+                else:
+                    for idx, c in collections.Counter(posting).items():
+                        shared[idx] += min(c, count)
+            pool = []
+            for idx, c in shared.items():
+                length = len(self._words[idx])
+                if abs(length - n) <= max_distance and \
+                        c >= max(length, n) + self.q - 1 - \
+                        max_distance * (self.q + 1):
+                    pool.append(idx)
+        else:
+            # The query is too short for count filtering to prune anything.
+            pool = [idx for length in range(max(n - max_distance, 0),
+                                            n + max_distance + 1)
+                    for idx in self._by_length.get(length, ())]
+
+        found = {}
+        if n == 0:
+            for idx in pool:
+                found[self._words[idx]] = len(self._words[idx])
+            return found, len(pool)
+
+        bound = aligned_bound(max_distance)
+        peq = {}
+        for i, c in enumerate(word):
+            peq[c] = peq.get(c, 0) | (1 << i)
+        for idx in pool:
+            w = self._words[idx]
+            dist = _myers(peq, n, w)
+            if dist <= bound:
+                dist = exact_distance(word, w, dist)
+            if dist <= max_distance:
+                found[w] = dist
+        return found, len(pool)
+
+    def candidates(self, word, max_distance=2, stats=None):
+        """Return the known words within max_distance from word, grouped by
+        distance.
+
+        word (string): the (possibly misspelled) word.
+        max_distance (int): the maximum distance.
+        stats (Counter): if given, the number of words verified with Myers'
+            algorithm is added to stats['qgram_verified'].
+
+        return (list): a list of max_distance + 1 sets, the i-th one
+            containing the known words within distance i.
+
+        """
+        found, verified = self.search(word, max_distance)
+        if stats is not None:
+            stats['qgram_verified'] += verified
+        return group(found, max_distance)
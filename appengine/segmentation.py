@@ -0,0 +1,207 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Correction of missing and extra spaces.
+
+Besides being kept (and corrected as usual), a word can be split into two
+known words ("lacasa" into "la casa"), and two adjacent words can be merged
+into a known word ("bianco fiore" into "biancofiore"); both cost as much as
+an edit. The words are compared with a bigram language model built on the
+same counts: the probability of a word after another one is the count of
+the bigram over the count of the first word or, if the bigram is unknown,
+BACKOFF times the count of the word over the total of the counts ("stupid
+backoff"). Kept words are represented by their most probable candidate
+regardless of context.
+
+The segmentation of the sentence is chosen by dynamic programming: for each
+position, only the most probable segmentation of the words before it ending
+with each word is kept (Viterbi).
+
+"""
+
+from __future__ import division
+
+import math
+
+BACKOFF = 0.4
+
+
+def splits(word, words):
+    """Return the ways of splitting word into two known words.
+
+    word (string): the word.
+    words (object): the dictionary (supporting 'in').
+
+    return (list): the (left, right) pairs.
+
+    """
+    return [(word[:i], word[i:]) for i in range(1, len(word))
+            if word[:i] in words and word[i:] in words]
+
+
+class Segmentation(object):
+    """Split and merge hypotheses of a sentence.
+
+    Kept words are the candidates of each position, in the form
+    [w_prev, w, w_next, channel model probability] (see main.extend()).
+
+    """
+
+    def __init__(self, words, joinable, dictionary, probability):
+        """Find the hypotheses.
+
+        words (list): the words of the sentence.
+        joinable (list): whether each word can be merged with the next one
+            (there is no punctuation between them).
+        dictionary (object): the known words (supporting 'in').
+        probability (float): the channel model probability of a split or a
+            merge.
+
+        """
+        self.probability = probability
+        self.splits = [splits(w, dictionary) for w in words]
+        self.merges = [None] * len(words)
+        for idx in range(len(words) - 1):
+            merged = words[idx] + words[idx + 1]
+            if joinable[idx] and merged in dictionary:
+                self.merges[idx] = merged
+
+    def __len__(self):
+        return sum(len(s) for s in self.splits) + \
+            sum(1 for m in self.merges if m is not None)
+
+    def _entries(self, idx, position_words):
+        # The first words of the hypotheses starting at idx.
+        res = set(position_words[idx])
+        res.update(left for left, _ in self.splits[idx])
+        if self.merges[idx] is not None:
+            res.add(self.merges[idx])
+        return res
+
+    def _exits(self, idx, position_words):
+        # The last words of the hypotheses ending at idx.
+        res = set(position_words[idx])
+        res.update(right for _, right in self.splits[idx])
+        if idx > 0 and self.merges[idx - 1] is not None:
+            res.add(self.merges[idx - 1])
+        return res
+
+    def requests(self, position_words):
+        """Return the keys needed to choose the segmentation, besides the
+        unigrams of the candidates and the bigrams between the candidates of
+        adjacent positions.
+
+        position_words (list): the set of the candidate words of each
+            position.
+
+        return ((list, list)): the unigrams and the bigrams, as (w1, w2)
+            pairs, both orders of the bigrams across positions being
+            requested.
+
+        """
+        unigrams = []
+        bigrams = []
+        for idx in range(len(position_words)):
+            for left, right in self.splits[idx]:
+                unigrams.extend((left, right))
+                bigrams.append((left, right))
+            if self.merges[idx] is not None:
+                unigrams.append(self.merges[idx])
+            if idx == 0:
+                continue
+            exits = self._exits(idx - 1, position_words)
+            entries = self._entries(idx, position_words)
+            for w_prev in exits:
+                for w in entries:
+                    if w_prev not in position_words[idx - 1] or \
+                            w not in position_words[idx]:
+                        bigrams.append((w_prev, w))
+                        bigrams.append((w, w_prev))
+        return unigrams, bigrams
+
+    def best(self, positions, lookup, total, stats=None):
+        """Return the most probable segmentation.
+
+        positions (list): the candidates of each position.
+        lookup (Lookup): the lookup holding the counts (see requests()).
+        total (int): the total of the unigram counts.
+        stats (Counter): if given, the number of words split
+            ('segment_splits') and merged ('segment_merges') are added to it.
+
+        return (list): for each position, None if the word is kept, the two
+            words of its split, separated by a space, or the merged word (and
+            an empty string for the next position).
+
+        """
+        def log_probability(w_prev, w):
+            if w_prev is not None:
+                bigram = lookup.bigram(w_prev, w)
+                if bigram is not None:
+                    return math.log(min(
+                        int(bigram) / int(lookup.unigram(w_prev) or 1), 1.0))
+                return math.log(BACKOFF * int(lookup.unigram(w) or 1) / total)
+            return math.log(int(lookup.unigram(w) or 1) / total)
+
+        # The candidate kept at each position.
+        kept = [max(extended_candidates,
+                    key=lambda c: int(lookup.unigram(c[1]) or 1) * c[3])
+                for extended_candidates in positions]
+        log_split = math.log(self.probability)
+
+        # best[idx] maps the last word of the segmentations of the words
+        # before idx to the log-probability of the most probable one and
+        # its last step (the previous position, the previous last word and
+        # the output of the step).
+        best = [{} for _ in range(len(positions) + 1)]
+        best[0][None] = (0.0, None)
+
+        def relax(idx, w, log_p, step):
+            if w not in best[idx] or log_p > best[idx][w][0]:
+                best[idx][w] = (log_p, step)
+
+        for idx in range(len(positions)):
+            for w_prev, (log_p, _) in best[idx].items():
+                w = kept[idx][1]
+                relax(idx + 1, w, log_p + math.log(kept[idx][3]) +
+                      log_probability(w_prev, w), (idx, w_prev, None))
+                for left, right in self.splits[idx]:
+                    relax(idx + 1, right, log_p + log_split +
+                          log_probability(w_prev, left) +
+                          log_probability(left, right),
+                          (idx, w_prev, left + " " + right))
+                if self.merges[idx] is not None:
+                    w = self.merges[idx]
+                    relax(idx + 2, w, log_p + log_split +
+                          log_probability(w_prev, w), (idx, w_prev, w))
+
+        res = [None] * len(positions)
+        w = max(best[-1], key=lambda w: best[-1][w][0])
+        idx = len(positions)
+        while idx > 0:
+            prev_idx, w_prev, output = best[idx][w][1]
+            if output is not None:
+                res[prev_idx] = output
+                if idx - prev_idx == 2:
+                    res[prev_idx + 1] = ""
+                    if stats is not None:
+                        stats['segment_merges'] += 1
+                elif stats is not None:
+                    stats['segment_splits'] += 1
+            idx, w = prev_idx, w_prev
+        return res
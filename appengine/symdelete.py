@@ -0,0 +1,204 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Candidate generation with a symmetric-delete index.
+
+Every dictionary word is indexed under each string obtained by deleting up
+to max_distance of its letters. Two strings within max_distance edits share
+at least one such delete, so a lookup only has to enumerate the deletes of
+the query (O(len^2) strings) instead of edits1 of edits1 (O(len^2 *
+alphabet^2) strings).
+
+"""
+
+import codecs
+
+from edits import alphabet, damerau_levenshtein, edits1
+
+
+def deletes(word, max_distance):
+    """Return every string obtained by deleting up to max_distance letters
+    from word (word itself included).
+
+    word (string): the word to be processed.
+    max_distance (int): the maximum number of deletions.
+
+    return (set): the deletes.
+
+    """
+    res = set([word])
+    frontier = res
+    for _ in range(max_distance):
+        frontier = set(w[:i] + w[i + 1:] for w in frontier
+                       for i in range(len(w)))
+        res |= frontier
+    return res
+
+
+def _preimages(word, chars):
+    """Return the strings that edits1() turns into word.
+
+    word (string): the edited string.
+    chars (set): the letters the original string may contain.
+
+    return (generator): the strings s such that word is in edits1(s).
+
+    """
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    # word was obtained with a deletion.
+    for a, b in splits:
+        for c in chars:
+            yield a + c + b
+    # word was obtained with a transposition.
+    for a, b in splits:
+        if len(b) > 1:
+            yield a + b[1] + b[0] + b[2:]
+    # word was obtained with a replacement or an insertion, both of which
+    # only use letters from alphabet.
+    for a, b in splits:
+        if b and b[0] in alphabet:
+            for c in chars:
+                yield a + c + b[1:]
+            yield a + b[1:]
+
+
+class SymmetricDeleteIndex(object):
+    """Candidate generator backed by a precomputed symmetric-delete index.
+
+    It returns exactly the same sets as edits.Edits: the index retrieves
+    every dictionary word sharing a delete with the query, a
+    Damerau-Levenshtein check keeps those within reach and, when letters
+    outside alphabet are involved (edits1 can delete them but never insert
+    them), an exact check against edits1(word) settles the remaining ones.
+
+    """
+
+    def __init__(self, words, max_distance=2):
+        """Build the index.
+
+        words (iterable): the dictionary (a set is used as is, without
+            copying it).
+        max_distance (int): the maximum distance supported by lookups.
+
+        """
+        self.max_distance = max_distance
+        if not isinstance(words, (set, frozenset)):
+            words = set(words)
+        self._words = words
+        self._index = {}
+        for w in words:
+            for d in deletes(w, max_distance):
+                # Most deletes map to a single word: store it as a plain
+                # string and switch to a list only when needed, which saves a
+                # lot of memory.
+                entry = self._index.get(d)
+                if entry is None:
+                    self._index[d] = w
+                elif isinstance(entry, list):
+                    entry.append(w)
+                else:
+                    self._index[d] = [entry, w]
+
+    @classmethod
+    def fromfile(cls, path, max_distance=2):
+        """Build the index from a file with one word per line.
+
+        path (string): the path of the words file.
+        max_distance (int): the maximum distance supported by lookups.
+
+        return (SymmetricDeleteIndex): the index.
+
+        """
+        with codecs.open(path, 'r', 'utf8') as f:
+            return cls((line.rstrip('\n') for line in f), max_distance)
+
+    def __contains__(self, word):
+        return word in self._words
+
+    def __len__(self):
+        return len(self._words)
+
+    def lookup(self, word, max_distance=None):
+        """Return the dictionary words sharing a delete with word.
+
+        This is a superset of the words within max_distance edits.
+
+        word (string): the (possibly misspelled) word.
+        max_distance (int): the maximum number of deletions on each side
+            (defaults to the one of the index).
+
+        return (set): the retrieved words.
+
+        """
+        if max_distance is None:
+            max_distance = self.max_distance
+        res = set()
+        for d in deletes(word, max_distance):
+            entry = self._index.get(d)
+            if entry is None:
+                continue
+            if isinstance(entry, list):
+                res.update(entry)
+            else:
+                res.add(entry)
+        return res
+
+    def candidates(self, word, max_distance=2, stats=None):
+        """Return the known words reachable from word, grouped by edits.
+
+        word (string): the (possibly misspelled) word.
+        max_distance (int): the maximum number of edits (at most the one of
+            the index).
+        stats (Counter): unused, see edits.Edits.candidates().
+
+        return (list): a list of max_distance + 1 sets, the i-th one
+            containing the known words within i edits (the same sets
+            as known([word]), known(edits1(word)) and known_edits2(word)).
+
+        """
+        if max_distance > self.max_distance:
+            raise ValueError("The index supports up to %d edits."
+                             % self.max_distance)
+        res = [set([word]) if word in self._words else set()]
+        if max_distance == 0:
+            return res
+
+        # edits1() only inserts letters from alphabet, so words containing
+        # other letters need the exact check.
+        chars = set(word) | set(alphabet)
+        e1 = None
+        within = [set() for _ in range(max_distance)]
+        for c in self.lookup(word, max_distance):
+            if not set(c) <= chars:
+                continue
+            dist = damerau_levenshtein(word, c)
+            if dist > max_distance:
+                continue
+            if word and set(word) | set(c) <= set(alphabet):
+                for i in range(max(dist, 1) - 1, max_distance):
+                    within[i].add(c)
+                continue
+            if e1 is None:
+                e1 = edits1(word)
+            if c in e1:
+                within[0].add(c)
+            if max_distance >= 2 and any(p in e1
+                                         for p in _preimages(c, chars)):
+                within[1].add(c)
+        return res + within
@@ -0,0 +1,83 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Classification of the input tokens.
+
+Numbers, dates, URLs, e-mail addresses, hashtags and the like are never
+words of the dictionary, and correcting them only means generating huge
+candidate sets that can never win. Every whitespace-separated token is
+matched once against a precompiled expression that peels the punctuation
+around it (the one stripped by computeFrequencies.py) and tells what it is;
+only words are corrected, the rest is passed through unchanged. Words longer
+than normalize.MAX_LENGTH characters have no key, so they are symbols too.
+
+"""
+
+import normalize
+import re
+
+WORD = 'word'
+NUMBER = 'number'
+URL = 'url'
+EMAIL = 'email'
+TAG = 'tag'
+SYMBOL = 'symbol'
+
+PUNCTUATION = normalize.EXCLUDE
+
+_TOKEN = re.compile(u"""
+    ^(?P<lead>[%(p)s]*)
+    (?:
+        (?P<url>(?:[a-z][a-z0-9+.-]*://|www\\.)\\S+?) |
+        (?P<email>[^@\\s]+@[^@\\s]+\\.[^@\\s]+?) |
+        (?P<tag>[#@]\\w+) |
+        (?P<word>\\S*?)
+    )
+    (?P<trail>[%(p)s]*)$
+    """ % {'p': re.escape(PUNCTUATION)},
+    re.UNICODE | re.VERBOSE | re.IGNORECASE)
+_LETTER = re.compile(r'[^\W\d_]', re.UNICODE)
+
+
+def classify(token):
+    """Split token into punctuation and core, and tell what the core is.
+
+    token (string): a whitespace-separated token.
+
+    return ((string, string, string, string)): the kind of the core (WORD,
+        NUMBER, URL, EMAIL, TAG or SYMBOL, the latter meaning no letter nor
+        digit at all, or letters that can't make a key, such as a word
+        longer than normalize.MAX_LENGTH), the leading punctuation, the core
+        and the trailing punctuation.
+
+    """
+    m = _TOKEN.match(token)
+    lead = m.group('lead')
+    trail = m.group('trail')
+    for kind in (URL, EMAIL, TAG):
+        if m.group(kind) is not None:
+            return kind, lead, m.group(kind), trail
+    core = m.group('word')
+    if _LETTER.search(core) is not None:
+        if normalize.normalize(core) is None:
+            return SYMBOL, lead, core, trail
+        return WORD, lead, core, trail
+    if any(c.isdigit() for c in core):
+        return NUMBER, lead, core, trail
+    return SYMBOL, lead, core, trail
@@ -0,0 +1,219 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compact trie of the dictionary with a bounded edit-distance traversal.
+
+The trie replaces the set of words: nodes are numbered in breadth-first
+order, so the children of a node are consecutive and the edge with global
+index e always leads to node e + 1. The whole structure is then just a
+string with the edge labels, an array with the first edge of each node and a
+bitmap of the nodes that end a word.
+
+The search walks the trie keeping one row of the edit-distance matrix per
+node and drops a subtree as soon as every entry of the row exceeds the
+maximum distance, so its cost does not depend on the size of the alphabet.
+Rows hold optimal string alignment distances, so the trie is searched up to
+edits.aligned_bound() and the distances of the words found are then
+corrected with edits.exact_distance().
+
+The trie can be built at instance start or loaded from a file written by
+this script, which is much faster:
+
+    ./trie.py -f words -o words.trie
+
+"""
+
+import argparse
+import codecs
+import sys
+
+from array import array
+
+from edits import aligned_bound, exact_distance, group
+
+
+class Trie(object):
+    """Candidate generator backed by a compact trie of the dictionary.
+
+    Distances are Damerau-Levenshtein distances, as in bktree.
+
+    """
+
+    def __init__(self, words=()):
+        """Build the trie.
+
+        words (iterable): the dictionary.
+
+        """
+        # Build a temporary trie made of dictionaries, then flatten it.
+        root = {}
+        for w in words:
+            node = root
+            for c in w:
+                node = node.setdefault(c, {})
+            node[None] = True
+
+        labels = []
+        self._first = array('i', [0])
+        self._terminal = bytearray()
+        level = [root]
+        while level:
+            next_level = []
+            for node in level:
+                self._terminal.append(1 if None in node else 0)
+                children = sorted(c for c in node if c is not None)
+                labels.extend(children)
+                next_level.extend(node[c] for c in children)
+                self._first.append(len(labels))
+            level = next_level
+        self._labels = u''.join(labels)
+
+    @classmethod
+    def load(cls, path):
+        """Load a trie saved with save().
+
+        path (string): the path of the file.
+
+        return (Trie): the trie.
+
+        """
+        trie = cls.__new__(cls)
+        with open(path, 'rb') as f:
+            nodes = int(f.readline())
+            trie._labels = f.readline().rstrip(b'\n').decode('utf8')
+            trie._terminal = bytearray(f.read(nodes))
+            trie._first = array('i')
+            trie._first.fromfile(f, nodes + 1)
+        return trie
+
+    def save(self, path):
+        """Save the trie in a file: the number of nodes and the labels (one
+        line each), followed by the bitmap and the array of first edges.
+
+        path (string): the path of the file.
+
+        """
+        with open(path, 'wb') as f:
+            f.write(("%d\n" % len(self._terminal)).encode('utf8'))
+            f.write(self._labels.encode('utf8') + b'\n')
+            f.write(bytes(self._terminal))
+            self._first.tofile(f)
+
+    def _child(self, node, c):
+        """Return the child of node reached with letter c (None if missing).
+
+        """
+        e = self._labels.find(c, self._first[node], self._first[node + 1])
+        return None if e < 0 else e + 1
+
+    def __contains__(self, word):
+        node = 0
+        for c in word:
+            node = self._child(node, c)
+            if node is None:
+                return False
+        return self._terminal[node] == 1
+
+    def __len__(self):
+        return sum(self._terminal)
+
+    def search(self, word, max_distance):
+        """Return every word within max_distance from word.
+
+        word (string): the (possibly misspelled) word.
+        max_distance (int): the maximum distance.
+
+        return ((dict, int)): the words found, mapped to their distance
+            from word, and the number of visited nodes.
+
+        """
+        bound = aligned_bound(max_distance)
+        found = {}
+        visited = 1
+        first_row = list(range(len(word) + 1))
+        if self._terminal[0] and first_row[-1] <= bound:
+            found[u''] = first_row[-1]
+
+        # Each element holds a node, the prefix leading to it, its row and
+        # the row of its parent (needed by transpositions).
+        stack = [(0, u'', first_row, None)]
+        while stack:
+            node, prefix, prev_row, prev_prev_row = stack.pop()
+            for e in range(self._first[node], self._first[node + 1]):
+                c = self._labels[e]
+                row = [prev_row[0] + 1]
+                for i in range(1, len(word) + 1):
+                    cost = 0 if word[i - 1] == c else 1
+                    d = min(row[i - 1] + 1, prev_row[i] + 1,
+                            prev_row[i - 1] + cost)
+                    if (prev_prev_row is not None and i > 1 and
+                            word[i - 1] == prefix[-1] and word[i - 2] == c):
+                        d = min(d, prev_prev_row[i - 2] + 1)
+                    row.append(d)
+                visited += 1
+                if row[-1] <= bound and self._terminal[e + 1]:
+                    found[prefix + c] = row[-1]
+                # Prune the subtree: no extension can get back in range.
+                if min(row) <= bound:
+                    stack.append((e + 1, prefix + c, row, prev_row))
+
+        for w, d in list(found.items()):
+            d = exact_distance(word, w, d)
+            if d > max_distance:
+                del found[w]
+            else:
+                found[w] = d
+        return found, visited
+
+    def candidates(self, word, max_distance=2, stats=None):
+        """Return the known words within max_distance from word, grouped by
+        distance.
+
+        word (string): the (possibly misspelled) word.
+        max_distance (int): the maximum distance.
+        stats (Counter): if given, the number of visited nodes is added to
+            stats['trie_visited'].
+
+        return (list): a list of max_distance + 1 sets, the i-th one
+            containing the known words within distance i.
+
+        """
+        found, visited = self.search(word, max_distance)
+        if stats is not None:
+            stats['trie_visited'] += visited
+        return group(found, max_distance)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Script to build a trie from a list of words.")
+    parser.add_argument("-f", "--file", help="source file with words",
+                        required=True)
+    parser.add_argument("-o", "--output", help="output file with the trie",
+                        required=True)
+
+    args = parser.parse_args()
+
+    with codecs.open(args.file, 'r', 'utf8') as f:
+        trie = Trie(line.rstrip('\n') for line in f)
+    trie.save(args.output)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Integer word-id encoding of bigram keys.
+
+Every unigram gets a dense integer id, its rank in the unigrams frequencies
+file (which computeFrequencies.py writes from the most to the least
+frequent). A bigram is then stored under the two ids, each encoded as a
+varint (7 bits per byte, the high bit set on every byte but the last), so
+the most frequent words take a single byte instead of the whole word.
+Packed keys start with PREFIX, a byte that never occurs in UTF-8, so they
+can't clash with plain keys stored in the same database.
+
+Ids change whenever the ranks are regenerated from new counts, so a store
+of packed keys also holds, under VERSION_KEY, the version() of the ids it
+was written with: a store read with other ids would silently miss its keys.
+
+"""
+
+import codecs
+import zlib
+
+PREFIX = b'\xff'
+# Not a packed key, as it doesn't end after two varints.
+VERSION_KEY = PREFIX + b'version'
+
+
+def encode_id(n):
+    """Return the varint encoding of n.
+
+    n (int): a non-negative integer.
+
+    return (bytearray): the encoding.
+
+    """
+    res = bytearray()
+    while n >= 0x80:
+        res.append((n & 0x7f) | 0x80)
+        n >>= 7
+    res.append(n)
+    return res
+
+
+def bigram_key(id1, id2):
+    """Return the packed key of the bigram made of the words id1 and id2.
+
+    id1 (int): the id of the first word.
+    id2 (int): the id of the second word.
+
+    return (bytes): the key.
+
+    """
+    return PREFIX + bytes(encode_id(id1) + encode_id(id2))
+
+
+def encode_key(key, ids):
+    """Return the packed key of a "w1 w2" bigram key.
+
+    key (string): the plain key.
+    ids (dict): the word ids.
+
+    return (bytes|None): the packed key, None if a word has no id.
+
+    """
+    words = key.split(' ', 1)
+    if len(words) != 2:
+        return None
+    id1 = ids.get(words[0])
+    id2 = ids.get(words[1])
+    if id1 is None or id2 is None:
+        return None
+    return bigram_key(id1, id2)
+
+
+def load(path):
+    """Return the word ids defined by a unigrams frequencies file.
+
+    path (string): the path of the file (with its header line).
+
+    return (dict): the ids, keyed by word.
+
+    """
+    ids = {}
+    with codecs.open(path, 'r', 'utf8') as f:
+        for idx, line in enumerate(f):
+            if idx > 0:  # skip first line (header)
+                ids[line.rsplit(' ', 1)[0]] = idx - 1
+    return ids
+
+
+def version(ids):
+    """Return the version of word ids, a checksum of the words in id order.
+
+    ids (dict): the word ids.
+
+    return (int): the version.
+
+    """
+    crc = 0
+    for word in sorted(ids, key=ids.get):
+        crc = zlib.crc32(word.encode('utf8') + b'\n', crc)
+    return crc & 0xffffffff
+
+
+def check_version(store, ids, required=True):
+    """Raise ValueError if a store of packed keys was written with other ids,
+    or holds no version while one is required (a store of plain keys would
+    then miss every packed key).
+
+    store (object): the store (see ngrams).
+    ids (dict): the word ids.
+    required (bool): whether a store without a version is an error.
+
+    """
+    stored = store.mget([VERSION_KEY])[0]
+    if stored is None:
+        if required:
+            raise ValueError("The bigrams hold no word ids version: they "
+                             "weren't stored with packed keys.")
+    elif int(stored) != version(ids):
+        raise ValueError("The bigrams were stored with other word ids "
+                         "(version %d, not %d)." % (int(stored), version(ids)))
+
+
+class IdEncodedStore(object):
+    """Store (see ngrams) translating "w1 w2" bigram keys into packed keys.
+
+    When fallback is set, the plain key is fetched as well (in the same round
+    trip) and used when the packed one is missing, so that a database can be
+    migrated while it's being served. Bigrams of words without an id are
+    always looked up with their plain key.
+
+    """
+
+    def __init__(self, store, ids, fallback=False):
+        """Initialize the store.
+
+        store (object): the wrapped store.
+        ids (dict): the word ids.
+        fallback (bool): whether plain keys should be looked up too.
+
+        """
+        self.store = store
+        self.ids = ids
+        self.fallback = fallback
+
+    def mget(self, keys, stats=None):
+        packed = [encode_key(k, self.ids) for k in keys]
+        query = [p for p in packed if p is not None]
+        plain = [k for k, p in zip(keys, packed)
+                 if p is None or self.fallback]
+        values = self.store.mget(query + plain, stats)
+        packed_values = iter(values[:len(query)])
+        plain_values = iter(values[len(query):])
+
+        res = []
+        for p in packed:
+            value = next(packed_values) if p is not None else None
+            if p is None or self.fallback:
+                plain_value = next(plain_values)
+                if value is None:
+                    value = plain_value
+            res.append(value)
+        return res
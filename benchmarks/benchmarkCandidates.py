@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import codecs
+import sys
+import time
+
+from os.path import dirname, join
+
+sys.path.insert(0, join(dirname(__file__), '..', 'appengine'))
+
+import bktree
+import edits
+import qgram
+import symdelete
+import trie
+
+"""Script to compare candidate generators on short and long Italian words.
+
+"""
+
+# Misspelled (and correctly spelled) Italian words of increasing length.
+SHORT_WORDS = ["anno", "hano", "cosa", "perche", "citta", "dove", "qundo",
+               "ecco"]
+LONG_WORDS = ["insufficenti", "particolarmente", "amministrazzione",
+              "caratteristiche", "contemporaneamente", "internazzionale",
+              "responsabilita", "sottolineatura"]
+
+
+def bench(generator, words, repeat):
+    """Return the average time (in seconds) spent by generator to compute the
+    candidates of each word.
+
+    generator (object): the candidate generator.
+    words (list): the words to be looked up.
+    repeat (int): how many times each lookup is repeated.
+
+    return (float): the average time per lookup.
+
+    """
+    begin_time = time.time()
+    for _ in range(repeat):
+        for w in words:
+            generator.candidates(w)
+    return (time.time() - begin_time) / (repeat * len(words))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to compare candidate generators.")
+    parser.add_argument("-w", "--words", help="words file (one per line)",
+                        required=True)
+    parser.add_argument("-b", "--bktree", help="BK-tree file (built from "
+                        "the words file if missing)")
+    parser.add_argument("-t", "--trie", help="trie file (built from the "
+                        "words file if missing)")
+    parser.add_argument("-r", "--repeat", help="how many times each lookup "
+                        "is repeated (default 3)", default=3, type=int)
+
+    args = parser.parse_args()
+
+    with codecs.open(args.words, 'r', 'utf8') as f:
+        words = set(line.rstrip('\n') for line in f)
+
+    generators = [("edits", edits.Edits(words))]
+
+    begin_time = time.time()
+    generators.append(("symdelete", symdelete.SymmetricDeleteIndex(words)))
+    print("symdelete index built in %.2f s" % (time.time() - begin_time))
+
+    begin_time = time.time()
+    if args.bktree is not None:
+        generators.append(("bktree", bktree.BKTree.load(args.bktree)))
+    else:
+        generators.append(("bktree", bktree.BKTree(words)))
+    print("bktree ready in %.2f s" % (time.time() - begin_time))
+
+    begin_time = time.time()
+    if args.trie is not None:
+        generators.append(("trie", trie.Trie.load(args.trie)))
+    else:
+        generators.append(("trie", trie.Trie(words)))
+    print("trie ready in %.2f s" % (time.time() - begin_time))
+
+    begin_time = time.time()
+    generators.append(("qgram", qgram.QGramIndex(words)))
+    print("qgram index built in %.2f s" % (time.time() - begin_time))
+
+    # Make sure the generators mimicking edits1/known_edits2 return the same
+    # candidates (the others are not bound to the edits1 alphabet).
+    for w in SHORT_WORDS + LONG_WORDS:
+        expected = generators[0][1].candidates(w)
+        for name, generator in generators[1:2]:
+            if generator.candidates(w) != expected:
+                print("%s returns different candidates for '%s'" % (name, w))
+                return -1
+
+    print("%-12s %12s %12s" % ("generator", "short (ms)", "long (ms)"))
+    for name, generator in generators:
+        print("%-12s %12.3f %12.3f" % (
+            name, bench(generator, SHORT_WORDS, args.repeat) * 1000,
+            bench(generator, LONG_WORDS, args.repeat) * 1000))
+
+if __name__ == '__main__':
+    sys.exit(main())
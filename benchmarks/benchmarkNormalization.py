@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import codecs
+import re
+import sys
+import time
+
+from os.path import dirname, join
+
+sys.path.insert(0, join(dirname(__file__), '..', 'appengine'))
+
+import normalize
+
+"""Script to measure how many tokens per second are normalized by the shared
+normalize module and by the code computeFrequencies.py used before it, and
+to check that both give the same keys.
+
+"""
+
+exclude = set(u'"!(),.:;?[]{}“”«»')
+
+SAMPLE = (u"«Nell’anno 1861, dopo la spedizione dei Mille (1860), "
+          u"il Regno d'Italia fu proclamato a Torino: VITTORIO Emanuele II "
+          u"ne divenne il re.» 17/03/1861 [cit. needed] http://it.wiki.org")
+
+
+def legacy(word):
+    """Return the key of word as computeFrequencies.py used to compute it,
+    None if it's not a valid key.
+
+    """
+    word = ''.join(c for c in word if c not in exclude)
+    search = re.compile(r'[^0-9 -/]').search
+    word = word.replace(u"’", "'")
+    word = word.lower()
+    if bool(search(word)) and word and len(word) <= 50:
+        return word
+    return None
+
+
+def bench(normalizer, tokens, repeat):
+    begin_time = time.time()
+    for _ in range(repeat):
+        for token in tokens:
+            normalizer(token)
+    return (time.time() - begin_time) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to measure the normalization of tokens.")
+    parser.add_argument("-f", "--file", help="text file to read the tokens "
+                        "from (default a sample sentence)")
+    parser.add_argument("-n", "--tokens", help="maximum number of tokens "
+                        "(default 1000000)", default=1000000, type=int)
+    parser.add_argument("-r", "--repeat", help="how many times the tokens "
+                        "are normalized (default 3)", default=3, type=int)
+
+    args = parser.parse_args()
+
+    if args.file is not None:
+        tokens = []
+        with codecs.open(args.file, 'r', 'utf8') as f:
+            for line in f:
+                tokens.extend(line.split())
+                if len(tokens) >= args.tokens:
+                    break
+        tokens = tokens[:args.tokens]
+    else:
+        sample = SAMPLE.split()
+        tokens = (sample * (args.tokens // len(sample) + 1))[:args.tokens]
+
+    mismatches = sum(1 for t in set(tokens)
+                     if legacy(t) != normalize.normalize(t))
+    if mismatches > 0:
+        print("%d tokens are normalized differently!" % mismatches)
+
+    t_legacy = bench(legacy, tokens, args.repeat)
+    t_shared = bench(normalize.normalize, tokens, args.repeat)
+    print("%12s %16s %16s %8s" % ("tokens", "legacy (tok/s)",
+                                  "shared (tok/s)", "speedup"))
+    print("%12d %16.0f %16.0f %7.1fx" % (len(tokens), len(tokens) / t_legacy,
+                                         len(tokens) / t_shared,
+                                         t_legacy / t_shared))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import random
+import sys
+import time
+
+from os.path import dirname, join
+
+sys.path.insert(0, join(dirname(__file__), '..', 'appengine'))
+
+import logscore
+
+"""Script to compare the product scorer with the NumPy log-space scorer on
+10, 1k and 100k candidates with random counts.
+
+"""
+
+SIZES = [10, 1000, 100000]
+CHANNEL_PROBABILITIES = [1.0, .001, .0001]
+
+
+def product(unigrams, lefts, rights, channel):
+    """Return the index of the best candidate, scored as main.score() does.
+
+    """
+    scores = [int(p1 or 1.0) * int(p2 or 1.0) * int(p3 or 1.0) * p4
+              for p1, p2, p3, p4 in zip(unigrams, lefts, rights, channel)]
+    return max(range(len(scores)), key=lambda idx: scores[idx])
+
+
+def counts(n, top, missing):
+    """Return n counts as stored in Redis (strings), Zipf-like distributed
+    below top, a fraction missing of them being missing (None).
+
+    """
+    return [None if random.random() < missing else
+            "%d\n" % (top // random.randint(1, top)) for _ in range(n)]
+
+
+def bench(scorer, args, repeat):
+    begin_time = time.time()
+    for _ in range(repeat):
+        scorer(*args)
+    return (time.time() - begin_time) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to compare candidate scorers.")
+    parser.add_argument("-r", "--repeat", help="how many times each scoring "
+                        "is repeated (default 10)", default=10, type=int)
+    parser.add_argument("-s", "--seed", help="random seed (default 0)",
+                        default=0, type=int)
+
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    print("%12s %14s %14s %8s" % ("candidates", "product (ms)", "log (ms)",
+                                  "speedup"))
+    for n in SIZES:
+        data = (counts(n, 10 ** 8, 0.1), counts(n, 10 ** 6, 0.9),
+                counts(n, 10 ** 6, 0.9),
+                [random.choice(CHANNEL_PROBABILITIES) for _ in range(n)])
+        t_product = bench(product, data, args.repeat)
+        # Previous word count, total of the counts and number of words.
+        t_log = bench(logscore.best, data + (10 ** 6, 10 ** 12, 10 ** 6),
+                      args.repeat)
+        print("%12d %14.3f %14.3f %7.1fx" % (n, t_product * 1000,
+                                             t_log * 1000,
+                                             t_product / t_log))
+
+if __name__ == '__main__':
+    sys.exit(main())
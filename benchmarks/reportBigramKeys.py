@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import codecs
+import os
+import sys
+import tempfile
+
+from os.path import dirname, join
+
+sys.path.insert(0, join(dirname(__file__), '..', 'appengine'))
+
+import ngramstore
+import wordids
+
+"""Script to compare the memory needed by plain and word-id bigram keys.
+
+It always reports the size of the keys and of the memory-mapped stores; if a
+Redis host is given, it also loads both layouts in turn into the (empty)
+database and reports the memory used by Redis.
+
+"""
+
+
+def redis_memory(r, items):
+    """Return the memory used by Redis to store items.
+
+    r (redis.client.StrictRedis): a connection to an empty database.
+    items (list): the (key, count) pairs.
+
+    return (int): the difference of used_memory before and after loading.
+
+    """
+    before = r.info('memory')['used_memory']
+    pipe = r.pipeline(transaction=False)
+    for idx, (k, v) in enumerate(items):
+        pipe.set(k, v)
+        if idx % 10000 == 0:
+            pipe.execute()
+    pipe.execute()
+    after = r.info('memory')['used_memory']
+    r.flushdb()
+    return after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to compare plain and word-id bigram keys.")
+    parser.add_argument("-u", "--unigrams", help="unigrams frequencies file",
+                        required=True)
+    parser.add_argument("-b", "--bigrams", help="bigrams frequencies file",
+                        required=True)
+    parser.add_argument("--host", help="redis host (optional, its database "
+                        "must be empty)")
+    parser.add_argument("--port", help="redis port (default 6379)",
+                        default=6379, type=int)
+    parser.add_argument("--db", help="redis database (default 15)",
+                        default=15, type=int)
+    parser.add_argument("--password", help="redis password (optional)")
+
+    args = parser.parse_args()
+
+    ids = wordids.load(args.unigrams)
+    plain = []
+    packed = []
+    with codecs.open(args.bigrams, 'r', 'utf8') as f:
+        for idx, line in enumerate(f):
+            if idx > 0:  # skip first line (header)
+                vals = line.rsplit(' ', 1)
+                count = int(vals[1])
+                plain.append((vals[0], count))
+                packed.append((wordids.encode_key(vals[0], ids) or vals[0],
+                               count))
+
+    rows = []
+    for name, items in (("plain", plain), ("ids", packed)):
+        key_bytes = sum(len(k if isinstance(k, bytes) else k.encode('utf8'))
+                        for k, _ in items)
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        ngramstore.write(path, items)
+        rows.append([name, key_bytes, os.path.getsize(path)])
+        os.remove(path)
+
+    if args.host is not None:
+        import redis
+        r = redis.StrictRedis(host=args.host, port=args.port, db=args.db,
+                              password=args.password)
+        if r.dbsize() > 0:
+            print("Database %d is not empty." % args.db)
+            return -1
+        rows[0].append(redis_memory(r, plain))
+        rows[1].append(redis_memory(r, packed))
+
+    print("%d bigrams, %d word ids" % (len(plain), len(ids)))
+    print("%-8s %16s %16s %16s" % ("keys", "key bytes", "mmap store",
+                                   "redis memory"))
+    for row in rows:
+        print("%-8s %16d %16d %16s" % (row[0], row[1], row[2],
+                                       row[3] if len(row) > 3 else "-"))
+
+if __name__ == '__main__':
+    sys.exit(main())
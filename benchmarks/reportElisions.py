@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import codecs
+import os
+import sys
+import tempfile
+
+from collections import Counter
+from os.path import dirname, join
+
+sys.path.insert(0, join(dirname(__file__), '..', 'appengine'))
+
+import edits
+import ngramstore
+import normalize
+
+"""Script to compare the vocabulary, keys and memory of counts computed with
+and without computeFrequencies.py --split-elisions.
+
+The split counts are derived from the plain ones: each elided word counts
+as its parts, each bigram counts for the pair across its boundary, and each
+occurrence of an elided word (its unigram count) for the pair inside it.
+They can be written out, to switch to split_elisions without recomputing the
+frequencies.
+
+"""
+
+
+def read(path):
+    """Return the counts of a frequencies file.
+
+    path (string): the path of the file.
+
+    return (Counter): the count of each key.
+
+    """
+    counter = Counter()
+    with codecs.open(path, 'r', 'utf8') as f:
+        for idx, line in enumerate(f):
+            if idx > 0:  # skip first line (header)
+                vals = line.rsplit(' ', 1)
+                counter[vals[0]] += int(vals[1])
+    return counter
+
+
+def write(path, counter):
+    """Write counts as computeFrequencies.py does.
+
+    path (string): the path of the file.
+    counter (Counter): the count of each key.
+
+    """
+    with codecs.open(path, 'w', 'utf8') as out:
+        out.write("%d %d\n" % (len(counter), sum(counter.values())))
+        for k, v in counter.most_common():
+            out.write("%s %d\n" % (k, v))
+
+
+def split(unigrams, bigrams):
+    """Return the counts of split elisions derived from the plain ones.
+
+    unigrams (Counter): the plain unigram counts.
+    bigrams (Counter): the plain bigram counts.
+
+    return ((Counter, Counter)): the split unigram and bigram counts.
+
+    """
+    split_unigrams = Counter()
+    split_bigrams = Counter()
+    for word, count in unigrams.items():
+        parts = normalize.split_elision(word)
+        for part in parts:
+            split_unigrams[part] += count
+        if len(parts) > 1:
+            split_bigrams[" ".join(parts)] += count
+    for bigram, count in bigrams.items():
+        first, second = bigram.split(" ", 1)
+        split_bigrams[normalize.split_elision(first)[-1] + " " +
+                      normalize.split_elision(second)[0]] += count
+    return split_unigrams, split_bigrams
+
+
+def memory(unigrams, bigrams):
+    """Return the memory needed by counts.
+
+    unigrams (Counter): the unigram counts.
+    bigrams (Counter): the bigram counts.
+
+    return ((int, int, int)): the bytes of the keys, of the memory-mapped
+        stores and of the set of words of the API.
+
+    """
+    key_bytes = 0
+    store_bytes = 0
+    for counter in (unigrams, bigrams):
+        key_bytes += sum(len(k.encode('utf8')) for k in counter)
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        ngramstore.write(path, counter.items())
+        store_bytes += os.path.getsize(path)
+        os.remove(path)
+    words = set(unigrams)
+    words_bytes = sys.getsizeof(words) + sum(sys.getsizeof(w) for w in words)
+    return key_bytes, store_bytes, words_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to compare counts with and without split "
+        "elisions.")
+    parser.add_argument("-u", "--unigrams", help="unigrams frequencies file "
+                        "(computed without --split-elisions)", required=True)
+    parser.add_argument("-b", "--bigrams", help="bigrams frequencies file "
+                        "(computed without --split-elisions)", required=True)
+    parser.add_argument("-s", "--sample", help="number of the most frequent "
+                        "elided words whose edits are counted (default "
+                        "1000)", default=1000, type=int)
+    parser.add_argument("--output-unigrams", help="write the split unigrams "
+                        "frequencies to this file")
+    parser.add_argument("--output-bigrams", help="write the split bigrams "
+                        "frequencies to this file")
+
+    args = parser.parse_args()
+
+    unigrams = read(args.unigrams)
+    bigrams = read(args.bigrams)
+    split_unigrams, split_bigrams = split(unigrams, bigrams)
+
+    elided = [(w, c) for w, c in unigrams.most_common()
+              if len(normalize.split_elision(w)) > 1]
+    print("%d of %d words are elided (%.1f%% of the occurrences)"
+          % (len(elided), len(unigrams),
+             100 * sum(c for _, c in elided) / max(sum(unigrams.values()), 1)))
+
+    # Length of the longest string to correct, number of strings one edit
+    # away and (roughly) two edits away, weighted by count, for the most
+    # frequent elided words.
+    sample = elided[:args.sample]
+    total = max(sum(c for _, c in sample), 1)
+    length = [0, 0]
+    fanout1 = [0, 0]
+    fanout2 = [0, 0]
+    for w, c in sample:
+        for idx, strings in enumerate(([w], normalize.split_elision(w))):
+            length[idx] += max(len(s) for s in strings) * c
+            for s in strings:
+                n = len(edits.edits1(s))
+                fanout1[idx] += n * c
+                fanout2[idx] += n * (2 * len(s) * len(edits.alphabet) +
+                                     2 * len(s)) * c
+
+    rows = []
+    for name, uni, bi, idx in (("plain", unigrams, bigrams, 0),
+                               ("split", split_unigrams, split_bigrams, 1)):
+        rows.append((name, len(uni), len(bi)) + memory(uni, bi) +
+                    (length[idx] / total, fanout1[idx] / total,
+                     fanout2[idx] / total))
+    print("%-6s %10s %10s %12s %12s %12s %7s %7s %9s"
+          % ("counts", "unigrams", "bigrams", "key bytes", "mmap stores",
+             "words set", "length", "edits1", "edits2"))
+    for row in rows:
+        print("%-6s %10d %10d %12d %12d %12d %7.1f %7.0f %9.0f" % row)
+
+    if args.output_unigrams is not None:
+        write(args.output_unigrams, split_unigrams)
+    if args.output_bigrams is not None:
+        write(args.output_bigrams, split_bigrams)
+
+if __name__ == '__main__':
+    sys.exit(main())
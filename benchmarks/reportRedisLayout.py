@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import codecs
+import redis
+import sys
+
+from os.path import dirname, join
+
+sys.path.insert(0, join(dirname(__file__), '..', 'appengine'))
+
+import ngrams
+
+"""Script to compare the memory used by Redis to store a frequencies file as
+plain keys and as hash buckets (see frequenciesToRedis.py --buckets).
+
+Both layouts are loaded in turn into the same database, which must be empty
+and is flushed afterwards. Used memory is exact; resident memory is only
+meaningful for the first layout, as the allocator does not give the memory
+back after a flush (restart Redis and use --layout to measure the other).
+
+"""
+
+
+def load(r, items, buckets):
+    """Load items and return the memory used by Redis afterwards.
+
+    r (redis.client.StrictRedis): a connection to the database.
+    items (list): the (key, count) pairs.
+    buckets (int): the number of hashes (0 for plain keys).
+
+    return ((int, int)): used_memory and used_memory_rss, in bytes.
+
+    """
+    pipe = r.pipeline(transaction=False)
+    for idx, (k, v) in enumerate(items):
+        if buckets > 0:
+            pipe.hset(ngrams.bucket(k, buckets), k, v)
+        else:
+            pipe.set(k, v)
+        if idx % 10000 == 0:
+            pipe.execute()
+    pipe.execute()
+    info = r.info('memory')
+    return info['used_memory'], info['used_memory_rss']
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to compare plain and hash-bucketed Redis "
+        "layouts.")
+    parser.add_argument("-f", "--file", help="source file with frequencies",
+                        required=True)
+    parser.add_argument("--buckets", help="number of hashes (default: the "
+                        "number of keys / 100)", default=0, type=int)
+    parser.add_argument("--layout", help="layouts to load (default both)",
+                        choices=["plain", "hashes", "both"], default="both")
+    parser.add_argument("--host", help="redis host (default localhost)",
+                        default="127.0.0.1")
+    parser.add_argument("--port", help="redis port (default 6379)",
+                        default=6379, type=int)
+    parser.add_argument("--db", help="redis database, which must be empty "
+                        "(default 15)", default=15, type=int)
+    parser.add_argument("--password", help="redis password (optional)")
+
+    args = parser.parse_args()
+
+    items = []
+    with codecs.open(args.file, 'r', 'utf8') as f:
+        for idx, line in enumerate(f):
+            if idx > 0:  # skip first line (header)
+                vals = line.rsplit(' ', 1)
+                items.append((vals[0], int(vals[1])))
+    buckets = args.buckets or max(len(items) // 100, 1)
+
+    r = redis.StrictRedis(host=args.host, port=args.port, db=args.db,
+                          password=args.password)
+    if r.dbsize() > 0:
+        print("Database %d is not empty." % args.db)
+        return -1
+
+    base = r.info('memory')
+    rows = []
+    for name, n in (("plain", 0), ("hashes", buckets)):
+        if args.layout not in (name, "both"):
+            continue
+        used, rss = load(r, items, n)
+        encoding = r.object('encoding', r.randomkey())
+        r.flushdb()
+        rows.append((name, used - base['used_memory'],
+                     rss - base['used_memory_rss'], encoding))
+
+    print("%d keys, %d buckets" % (len(items), buckets))
+    print("%-8s %16s %16s %12s %10s" % ("layout", "used memory",
+                                        "resident memory", "bytes/key",
+                                        "encoding"))
+    for name, used, rss, encoding in rows:
+        if isinstance(encoding, bytes):
+            encoding = encoding.decode('ascii')
+        print("%-8s %16d %16d %12.1f %10s" % (name, used, rss,
+                                              used / len(items), encoding))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -22,7 +22,6 @@ import codecs
 import logging
 import multiprocessing
 import queue
-import re
 import string
 import sys
 import time
@@ -30,9 +29,14 @@ import traceback
 
 from collections import Counter
 from os import listdir
-from os.path import isdir, isfile, join
+from os.path import dirname, isdir, isfile, join
 
-exclude = set(u'"!(),.:;?[]{}“”«»')
+# The Bloom filter format and the normalization of words are shared with the
+# API, which lives in appengine/.
+sys.path.insert(0, join(dirname(__file__), 'appengine'))
+
+import bloom
+import normalize
 
 
 class Worker(multiprocessing.Process):
@@ -40,7 +44,7 @@ class Worker(multiprocessing.Process):
 
     """
 
-    def __init__(self, queue, results_queue, type):
+    def __init__(self, queue, results_queue, type, elisions=False):
         """Initialize the process with information it requires.
 
         queue (multiprocessing.JoinableQueue): the queue containing the work,
@@ -48,12 +52,15 @@ class Worker(multiprocessing.Process):
         results_queue (multiprocessing.Queue): the queue that will contain the
             results, each element is a Counter (collections.Counter).
         type (string): whether to compute 'unigrams' or 'bigrams' frequencies.
+        elisions (bool): whether to split elided words ("dell'anno") from the
+            word they precede.
 
         """
         multiprocessing.Process.__init__(self)
         self._queue = queue
         self._results_queue = results_queue
         self._count = Counter()
+        self._elisions = elisions
 
         if type == "unigrams":
             self._process = self._processUnigrams
@@ -64,6 +71,26 @@ class Worker(multiprocessing.Process):
             # work as expected.
             raise Exception("Internal error.")
 
+    def _words(self, line):
+        """Return the normalized words of a line (see normalize.py), None
+        standing for the tokens that are not valid keys.
+
+        line (string): the line to be processed.
+
+        return (list): the words.
+
+        """
+        words = [normalize.normalize(word) for word in line.split()]
+        if not self._elisions:
+            return words
+        res = []
+        for word in words:
+            if word is None:
+                res.append(None)
+            else:
+                res.extend(normalize.split_elision(word))
+        return res
+
     def _processUnigrams(self, line):
         """Process a line and increment Counter for each word found.
 
@@ -72,12 +99,8 @@ class Worker(multiprocessing.Process):
         line (string): the line to be processed.
 
         """
-        for word in line.split():
-            word = ''.join(c for c in word if c not in exclude)
-            search = re.compile(r'[^0-9 -/]').search
-            word = word.replace(u"’", "'")
-            word = word.lower()
-            if bool(search(word)) and word and len(word) <= 50:
+        for word in self._words(line):
+            if word is not None:
                 self._count[word] += 1
 
     def _processBigrams(self, line):
@@ -91,19 +114,11 @@ class Worker(multiprocessing.Process):
         line (string): the line to be processed.
 
         """
-        words = line.split()
+        words = self._words(line)
         for word_idx in range(len(words) - 1):
-            pair = [words[word_idx], words[word_idx + 1]]
-            good = True
-            for idx, word in enumerate(pair):
-                word = ''.join(c for c in word if c not in exclude)
-                search = re.compile(r'[^0-9 -/]').search
-                word = word.replace(u"’", "'").lower()
-                if not bool(search(word)) or not word or len(word) > 50:
-                    good = False
-                pair[idx] = word
-            if good:
-                self._count[" ".join(pair)] += 1
+            if words[word_idx] is not None and \
+                    words[word_idx + 1] is not None:
+                self._count[words[word_idx] + " " + words[word_idx + 1]] += 1
 
     def run(self):
         """Loop until there are (in queue) new jobs to be executed.
@@ -145,6 +160,15 @@ def main():
                         "'bigrams'", required=True)
     parser.add_argument("-o", "--output", help="output file with results",
                         required=True)
+    parser.add_argument("--split-elisions", action='store_true',
+                        help="count elided words (\"dell'anno\") apart from "
+                        "the word they precede (the API needs "
+                        "split_elisions then)")
+    parser.add_argument("--bloom", help="also write a Bloom filter of the "
+                        "keys to BLOOM")
+    parser.add_argument("--error-rate", help="false positive rate of the "
+                        "Bloom filter (default 0.01)", default=0.01,
+                        type=float)
     parser.add_argument("-v", "--verbose", action='store_true',
                         help="print debugging information")
 
@@ -204,7 +228,7 @@ def main():
 
     # Spawn a process for every CPU.
     for _ in range(multiprocessing.cpu_count()):
-        w = Worker(queue, results_queue, args.type)
+        w = Worker(queue, results_queue, args.type, args.split_elisions)
         w.start()
         workers.append(w)
 
@@ -243,6 +267,13 @@ def main():
         for k, v in counter.most_common():
             out.write("%s %d\n" % (k, v))
 
+    if args.bloom is not None:
+        logger.debug("Writing Bloom filter...")
+        bloom_filter = bloom.BloomFilter(len(counter), args.error_rate)
+        for k in counter:
+            bloom_filter.add(k)
+        bloom_filter.save(args.bloom)
+
     logger.debug("Done in %s seconds." % (time.time() - begin_time))
 
 if __name__ == '__main__':
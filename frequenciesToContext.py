@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import codecs
+import sys
+
+from collections import defaultdict
+
+"""Script to get the most frequent successors and predecessors of each word
+from bigrams frequencies (see appengine/context.py).
+
+"""
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Script to get successors and predecessors of words.")
+    parser.add_argument("-f", "--file", help="bigrams frequencies file",
+                        required=True)
+    parser.add_argument("-o", "--output", help="output file with results",
+                        required=True)
+    parser.add_argument("-n", "--top", help="number of successors and "
+                        "predecessors kept for each word (default 200)",
+                        default=200, type=int)
+
+    args = parser.parse_args()
+
+    successors = defaultdict(list)
+    predecessors = defaultdict(list)
+
+    # Bigrams are sorted from the most to the least frequent, so the first
+    # ones found are the best.
+    with codecs.open(args.file, 'r', 'utf8') as f:
+        for idx, line in enumerate(f):
+            if idx > 0:  # skip first line (header)
+                w1, w2 = line.rsplit(' ', 1)[0].split(' ', 1)
+                if len(successors[w1]) < args.top:
+                    successors[w1].append(w2)
+                if len(predecessors[w2]) < args.top:
+                    predecessors[w2].append(w1)
+
+    with codecs.open(args.output, 'w', 'utf8') as f:
+        for w, ws in successors.items():
+            f.write("next %s %s\n" % (w, " ".join(ws)))
+        for w, ws in predecessors.items():
+            f.write("prev %s %s\n" % (w, " ".join(ws)))
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import codecs
+import logging
+import sys
+
+from os.path import dirname, join
+
+# The graph format and the index are shared with the API, which lives in
+# appengine/.
+sys.path.insert(0, join(dirname(__file__), 'appengine'))
+
+import neighbors
+import symdelete
+
+"""Script to build the graph of the dictionary neighbors of the most
+frequent words (see appengine/neighbors.py).
+
+Neighbors are the candidates that the 'edits' and 'symdelete' generators
+return, so the graph gives the same corrections.
+
+"""
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Script to build the neighbor graph of frequent words.")
+    parser.add_argument("-f", "--file", help="unigrams frequencies file",
+                        required=True)
+    parser.add_argument("-w", "--words", help="words file used by the API",
+                        required=True)
+    parser.add_argument("-o", "--output", help="output graph file",
+                        required=True)
+    parser.add_argument("--top", help="number of most frequent words with "
+                        "neighbors (default 100000)", default=100000,
+                        type=int)
+    parser.add_argument("-v", "--verbose", action='store_true',
+                        help="print debugging information")
+
+    args = parser.parse_args()
+    logger = logging.getLogger()
+
+    # Adjust logger verbosity.
+    if args.verbose is True:
+        logging.basicConfig(level=logging.DEBUG,
+                            format='%(asctime)s %(levelname)-8s %(message)s',
+                            datefmt='%Y-%m-%d %H:%M:%S')
+    else:
+        logging.basicConfig(level=logging.WARNING,
+                            format='%(asctime)s %(levelname)-8s %(message)s',
+                            datefmt='%Y-%m-%d %H:%M:%S')
+
+    index = symdelete.SymmetricDeleteIndex.fromfile(args.words)
+    logger.debug("Indexed %d words." % len(index))
+
+    # The frequencies file is sorted from the most to the least frequent.
+    frequent = []
+    with codecs.open(args.file, 'r', 'utf8') as f:
+        for linecounter, line in enumerate(f):
+            if len(frequent) >= args.top:
+                break
+            if linecounter > 0:  # skip first line (header)
+                word = line.rsplit(' ', 1)[0]
+                if word in index:
+                    frequent.append(word)
+
+    words = []
+    ids = {}
+
+    def word_id(w):
+        if w not in ids:
+            ids[w] = len(words)
+            words.append(w)
+        return ids[w]
+
+    heads = []
+    for w in frequent:
+        within = index.candidates(w, 2)
+        heads.append((word_id(w), sorted(word_id(c) for c in within[1]),
+                      sorted(word_id(c) for c in within[2] - within[1])))
+
+    neighbors.write(args.output, words, heads)
+
+    logger.debug("Successfully done (%d heads, %d words)."
+                 % (len(heads), len(words)))
+
+if __name__ == '__main__':
+    sys.exit(main())
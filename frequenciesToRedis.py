@@ -23,6 +23,15 @@ import logging
 import redis
 import sys
 
+from os.path import dirname, join
+
+# The key encodings are shared with the API, which lives in appengine/.
+sys.path.insert(0, join(dirname(__file__), 'appengine'))
+
+import bloom
+import ngrams
+import wordids
+
 """Script to send frequencies to a redis database.
 
 """
@@ -43,10 +52,28 @@ def main():
     parser.add_argument("--password", help="redis password (optional)")
     parser.add_argument("--min", help="do not send keys with value less than" +
                         " MIN", default=0, type=int)
+    parser.add_argument("--ids", help="store bigrams under packed word-id "
+                        "keys, ids being taken from the unigrams frequencies "
+                        "file IDS")
+    parser.add_argument("--buckets", help="store keys as fields of BUCKETS "
+                        "hashes instead of plain keys (to stay in Redis's "
+                        "compact encoding, use about the number of keys / "
+                        "100)", default=0, type=int)
+    parser.add_argument("--by-word", help="store bigrams as fields of the "
+                        "hash of their left word, of their right word or "
+                        "both", choices=["left", "right", "both"])
+    parser.add_argument("--bloom", help="also write a Bloom filter of the "
+                        "keys sent to BLOOM")
+    parser.add_argument("--error-rate", help="false positive rate of the "
+                        "Bloom filter (default 0.01)", default=0.01,
+                        type=float)
     parser.add_argument("-v", "--verbose", action='store_true',
                         help="print debugging information")
 
     args = parser.parse_args()
+    if args.by_word is not None and (args.ids is not None or
+                                     args.buckets > 0):
+        parser.error("--by-word can't be used with --ids or --buckets")
     logger = logging.getLogger()
 
     # Adjust logger verbosity.
@@ -65,26 +92,64 @@ def main():
     r = redis.StrictRedis(host=args.host, port=args.port, db=args.db,
                           password=args.password)
 
+    ids = wordids.load(args.ids) if args.ids is not None else None
+
     # Process the file.
     linecounter = 0
+    bloom_filter = None
     with codecs.open(args.file, 'r', 'utf8') as f:
         pipe = r.pipeline()
         for line in f:
+            if linecounter == 0 and args.bloom is not None:
+                # The header starts with the number of keys.
+                bloom_filter = bloom.BloomFilter(int(line.split()[0]),
+                                                 args.error_rate)
             if linecounter > 0:  # skip first line
                 vals = line.rsplit(' ', 1)
-                if (int(vals[1]) < args.min):
+                # Stored as integers (without the newline), so that
+                # updateWikiData.py can increment them.
+                count = int(vals[1])
+                if (count < args.min):
                     continue
-                pipe.set(vals[0], vals[1])
+                key = vals[0]
+                if bloom_filter is not None:
+                    bloom_filter.add(key)
+                if ids is not None:
+                    # Keep the plain key if a word has no id.
+                    key = wordids.encode_key(key, ids) or key
+                if args.by_word is not None:
+                    if args.by_word in ("left", "both"):
+                        name, field = ngrams.word_hash(key)
+                        pipe.hset(name, field, count)
+                    if args.by_word in ("right", "both"):
+                        name, field = ngrams.word_hash(key, True)
+                        pipe.hset(name, field, count)
+                elif args.buckets > 0:
+                    pipe.hset(ngrams.bucket(key, args.buckets), key, count)
+                else:
+                    pipe.set(key, count)
                 # Force redis to save every 10K keys.
                 if linecounter > 0 and linecounter % 10000 == 0:
                     res = pipe.execute()
-                    if (False in res):
+                    # HSET replies 0 when it overwrites a field, so look for
+                    # actual failures only.
+                    if any(v is False for v in res):
                         logger.error("An error occured during saving process.")
                     else:
                         logger.debug("Saved %d keys" % linecounter)
             linecounter += 1
+        if ids is not None:
+            # Record the ids the packed keys were written with.
+            if args.buckets > 0:
+                pipe.hset(ngrams.bucket(wordids.VERSION_KEY, args.buckets),
+                          wordids.VERSION_KEY, wordids.version(ids))
+            else:
+                pipe.set(wordids.VERSION_KEY, wordids.version(ids))
         pipe.execute()
 
+    if bloom_filter is not None:
+        bloom_filter.save(args.bloom)
+
     # Try to force a final save.
     try:
         r.save()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import codecs
+import logging
+import sys
+
+from os.path import dirname, join
+
+# The store format is shared with the API, which lives in appengine/.
+sys.path.insert(0, join(dirname(__file__), 'appengine'))
+
+import ngramstore
+import wordids
+
+"""Script to turn frequencies into an immutable, memory-mapped store that the
+API can use in place of Redis.
+
+"""
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Script to turn frequencies into a memory-mapped store.")
+    parser.add_argument("-f", "--file", help="source file with frequencies",
+                        required=True)
+    parser.add_argument("-o", "--output", help="output store file",
+                        required=True)
+    parser.add_argument("--min", help="do not store keys with value less " +
+                        "than MIN", default=0, type=int)
+    parser.add_argument("--ids", help="store bigrams under packed word-id "
+                        "keys, ids being taken from the unigrams frequencies "
+                        "file IDS")
+    parser.add_argument("-v", "--verbose", action='store_true',
+                        help="print debugging information")
+
+    args = parser.parse_args()
+    logger = logging.getLogger()
+
+    # Adjust logger verbosity.
+    if args.verbose is True:
+        logging.basicConfig(level=logging.DEBUG,
+                            format='%(asctime)s %(levelname)-8s %(message)s',
+                            datefmt='%Y-%m-%d %H:%M:%S')
+    else:
+        logging.basicConfig(level=logging.WARNING,
+                            format='%(asctime)s %(levelname)-8s %(message)s',
+                            datefmt='%Y-%m-%d %H:%M:%S')
+
+    ids = wordids.load(args.ids) if args.ids is not None else None
+
+    # Process the file.
+    items = []
+    with codecs.open(args.file, 'r', 'utf8') as f:
+        for linecounter, line in enumerate(f):
+            if linecounter > 0:  # skip first line
+                vals = line.rsplit(' ', 1)
+                if (int(vals[1]) < args.min):
+                    continue
+                key = vals[0]
+                if ids is not None:
+                    # Keep the plain key if a word has no id.
+                    key = wordids.encode_key(key, ids) or key
+                items.append((key, int(vals[1])))
+    if ids is not None:
+        # Record the ids the packed keys were written with.
+        items.append((wordids.VERSION_KEY, wordids.version(ids)))
+
+    ngramstore.write(args.output, items)
+
+    logger.debug("Successfully done (%d keys stored)." % len(items))
+
+if __name__ == '__main__':
+    sys.exit(main())
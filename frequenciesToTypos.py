@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import argparse
+import codecs
+import logging
+import sys
+
+from os.path import dirname, join
+
+# The edit distance and the index are shared with the API, which lives in
+# appengine/.
+sys.path.insert(0, join(dirname(__file__), 'appengine'))
+
+import edits
+import symdelete
+
+"""Script to mine a table of common misspellings from unigrams frequencies.
+
+Wikipedia contains its own typos: a rare token one edit away from a much
+more frequent word is most likely a misspelling of it. The table maps each
+such token to its correction, so that the API can correct it without
+generating and scoring any candidate. A token is left out when two
+corrections are about as frequent (the runner-up having at least half the
+count of the best one).
+
+"""
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Script to mine misspellings from unigrams frequencies.")
+    parser.add_argument("-f", "--file", help="unigrams frequencies file",
+                        required=True)
+    parser.add_argument("-o", "--output", help="output file with the table",
+                        required=True)
+    parser.add_argument("--max-count", help="only consider tokens seen at "
+                        "most MAX_COUNT times (default 10)", default=10,
+                        type=int)
+    parser.add_argument("--min-count", help="only consider corrections seen "
+                        "at least MIN_COUNT times (default 1000)",
+                        default=1000, type=int)
+    parser.add_argument("--ratio", help="only consider corrections at least "
+                        "RATIO times more frequent than the token (default "
+                        "100)", default=100, type=int)
+    parser.add_argument("-v", "--verbose", action='store_true',
+                        help="print debugging information")
+
+    args = parser.parse_args()
+    logger = logging.getLogger()
+
+    # Adjust logger verbosity.
+    if args.verbose is True:
+        logging.basicConfig(level=logging.DEBUG,
+                            format='%(asctime)s %(levelname)-8s %(message)s',
+                            datefmt='%Y-%m-%d %H:%M:%S')
+    else:
+        logging.basicConfig(level=logging.WARNING,
+                            format='%(asctime)s %(levelname)-8s %(message)s',
+                            datefmt='%Y-%m-%d %H:%M:%S')
+
+    counts = {}
+    with codecs.open(args.file, 'r', 'utf8') as f:
+        for linecounter, line in enumerate(f):
+            if linecounter > 0:  # skip first line (header)
+                vals = line.rsplit(' ', 1)
+                counts[vals[0]] = int(vals[1])
+
+    frequent = set(w for w, c in counts.items() if c >= args.min_count)
+    index = symdelete.SymmetricDeleteIndex(frequent, 1)
+    logger.debug("Indexed %d frequent words." % len(frequent))
+
+    table = []
+    for token, count in counts.items():
+        if count > args.max_count:
+            continue
+        corrections = sorted(
+            (counts[w], w) for w in index.lookup(token)
+            if counts[w] >= args.ratio * count and
+            edits.damerau_levenshtein(token, w) == 1)
+        if not corrections:
+            continue
+        if len(corrections) > 1 and \
+                2 * corrections[-2][0] >= corrections[-1][0]:
+            continue
+        table.append((token, corrections[-1][1]))
+
+    # Same layout as frequencies files: a header with the number of entries,
+    # then one "token correction" pair per line.
+    with codecs.open(args.output, 'w', 'utf8') as out:
+        out.write("%d\n" % len(table))
+        for token, correction in sorted(table):
+            out.write("%s %s\n" % (token, correction))
+
+    logger.debug("Successfully done (%d misspellings found)." % len(table))
+
+if __name__ == '__main__':
+    sys.exit(main())
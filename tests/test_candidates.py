@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of the candidate generators against their reference: edits1 and
+known_edits2 for the symmetric-delete index, the Damerau-Levenshtein
+distance for the others.
+
+"""
+
+import random
+import sys
+
+from os.path import dirname, join
+
+import pytest
+
+sys.path.insert(0, join(dirname(__file__), '..', 'appengine'))
+
+import bktree
+import edits
+import qgram
+import symdelete
+import trie
+
+WORDS = set([u"casa", u"case", u"cosa", u"caso", u"cassa", u"asca",
+             u"città", u"cita", u"citta", u"perché", u"perche", u"però",
+             u"pero", u"è", u"e", u"a", u"la", u"al", u"lá", u"bella",
+             u"balla", u"bell", u"ebll", u"buc", u"cb", u"àb"])
+
+
+def queries():
+    # The words themselves, their variants and a few random strings made of
+    # their letters.
+    rnd = random.Random(0)
+    letters = sorted(set(u"".join(WORDS)))
+    res = sorted(WORDS) + [u"", u"csa", u"caas", u"cittá", u"perchè",
+                           u"bcu", u"xyz", u"bela", u"eb"]
+    for _ in range(200):
+        res.append(u"".join(rnd.choice(letters)
+                            for _ in range(rnd.randint(1, 6))))
+    return res
+
+
+@pytest.mark.parametrize('max_distance', [1, 2])
+def test_symdelete_matches_edits(max_distance):
+    reference = edits.Edits(WORDS)
+    index = symdelete.SymmetricDeleteIndex(WORDS)
+    for word in queries():
+        assert index.candidates(word, max_distance) == \
+            reference.candidates(word, max_distance), word
+
+
+@pytest.mark.parametrize('generator', [
+    bktree.BKTree, trie.Trie, lambda words: qgram.QGramIndex(words, 2),
+    lambda words: qgram.QGramIndex(words, 3)])
+@pytest.mark.parametrize('max_distance', [1, 2, 3])
+def test_generator_matches_damerau_levenshtein(generator, max_distance):
+    index = generator(WORDS)
+    for word in queries():
+        distances = dict((w, edits.damerau_levenshtein(word, w))
+                         for w in WORDS)
+        expected = [set(w for w, d in distances.items() if d <= i)
+                    for i in range(max_distance + 1)]
+        assert index.candidates(word, max_distance) == expected, word
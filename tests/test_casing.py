@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of the casing of the corrections."""
+
+import sys
+
+from os.path import dirname, join
+
+import pytest
+
+sys.path.insert(0, join(dirname(__file__), '..', 'appengine'))
+
+import casing
+
+
+@pytest.mark.parametrize('typed, folded, corrected, expected', [
+    # Not corrected: the word is given back as typed.
+    (u"McDonald", u"mcdonald", u"mcdonald", u"McDonald"),
+    (u"casa", u"casa", u"casa", u"casa"),
+    (u"cassa", u"cassa", u"casa", u"casa"),
+    (u"CITTA", u"citta", u"città", u"CITTÀ"),
+    (u"Citta", u"citta", u"città", u"Città"),
+    # Mixed casing can't be carried over.
+    (u"CiTta", u"citta", u"città", u"città"),
+    # Split words: only the first one is capitalized.
+    (u"Lacasa", u"lacasa", u"la casa", u"La casa"),
+    (u"LACASA", u"lacasa", u"la casa", u"LA CASA"),
+    # Not str.title(): no capital after the apostrophe.
+    (u"Dellanno", u"dellanno", u"dell'anno", u"Dell'anno"),
+    # A single capital letter is title case.
+    (u"I", u"i", u"e", u"E"),
+])
+def test_restore(typed, folded, corrected, expected):
+    assert casing.restore(typed, folded, corrected) == expected
+
+
+def test_pattern():
+    assert casing.pattern(u"roma") == casing.LOWER
+    assert casing.pattern(u"Roma") == casing.TITLE
+    assert casing.pattern(u"I") == casing.TITLE
+    assert casing.pattern(u"ITALIA") == casing.UPPER
+    assert casing.pattern(u"McDonald") is None
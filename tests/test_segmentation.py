@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of the keys needed to split and merge words, as main.py fetches
+them in batched mode.
+
+"""
+
+import sys
+
+from os.path import dirname, join
+
+sys.path.insert(0, join(dirname(__file__), '..', 'appengine'))
+
+import ngrams
+import segmentation
+
+UNIGRAMS = {u"questa": 30000, u"casa": 500, u"bella": 1500, u"bzla": 2000}
+BIGRAMS = {u"questa casa": 20000, u"casa bella": 500}
+TOTAL = 100000
+
+
+class DictStore(object):
+    """Store (see ngrams) backed by a dictionary."""
+
+    def __init__(self, counts):
+        self.counts = counts
+
+    def mget(self, keys, stats=None):
+        return [self.counts.get(k) for k in keys]
+
+
+def test_questacasa_bzzla():
+    # "bella" (distance 2) only beats "bzla" (distance 1) after "casa", so
+    # the bigrams of "casa" with every candidate of "bzzla" are needed, as
+    # correct() fetches them word by word.
+    words = [u"questacasa", u"bzzla"]
+    positions = [[[None, u"questacasa", u"bzzla", 1.0]],
+                 [[None, u"bzzla", None, 1.0], [None, u"bzla", None, .001],
+                  [None, u"bella", None, .0001]]]
+    position_words = [set(c[1] for c in extended_candidates)
+                      for extended_candidates in positions]
+    hypotheses = segmentation.Segmentation(words, [True, False], UNIGRAMS,
+                                           .001)
+    unigrams, bigrams = hypotheses.requests(position_words)
+    for w in position_words[1]:
+        assert (u"casa", w) in bigrams
+        assert (w, u"casa") in bigrams
+
+    lookup = ngrams.Lookup(DictStore(UNIGRAMS), DictStore(BIGRAMS))
+    for extended_candidates in positions:
+        for candidate in extended_candidates:
+            lookup.add_unigram(candidate[1])
+    for w in unigrams:
+        lookup.add_unigram(w)
+    for w1, w2 in bigrams:
+        lookup.add_bigram(w1, w2)
+    lookup.fetch()
+    assert hypotheses.best([positions[0], positions[1][:2]], lookup,
+                           TOTAL) == [u"questa casa", None]
+    assert lookup.bigram(u"casa", u"bella") == 500
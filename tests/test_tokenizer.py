@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of the classification of the input tokens."""
+
+import sys
+
+from os.path import dirname, join
+
+import pytest
+
+sys.path.insert(0, join(dirname(__file__), '..', 'appengine'))
+
+import normalize
+import tokenizer
+
+
+@pytest.mark.parametrize('token, expected', [
+    (u"casa", (tokenizer.WORD, u"", u"casa", u"")),
+    (u"«Casa»,", (tokenizer.WORD, u"«", u"Casa", u"»,")),
+    # Punctuation inside a word is removed by normalization.
+    (u"ca,sa", (tokenizer.WORD, u"", u"ca,sa", u"")),
+    # Apostrophes are part of elided words.
+    (u"l'", (tokenizer.WORD, u"", u"l'", u"")),
+    (u"(12,5)", (tokenizer.NUMBER, u"(", u"12,5", u")")),
+    (u"12/10/2015", (tokenizer.NUMBER, u"", u"12/10/2015", u"")),
+    (u"www.x.it.", (tokenizer.URL, u"", u"www.x.it", u".")),
+    (u"http://x.it/a?b=1).", (tokenizer.URL, u"", u"http://x.it/a?b=1",
+                              u").")),
+    (u"mario@x.it,", (tokenizer.EMAIL, u"", u"mario@x.it", u",")),
+    (u"#tag!", (tokenizer.TAG, u"", u"#tag", u"!")),
+    (u"...", (tokenizer.SYMBOL, u"...", u"", u"")),
+    (u"—", (tokenizer.SYMBOL, u"", u"—", u"")),
+])
+def test_classify(token, expected):
+    assert tokenizer.classify(token) == expected
+
+
+def test_classify_long_word():
+    # Words longer than the keys can be are not corrected.
+    word = u"a" * normalize.MAX_LENGTH
+    assert tokenizer.classify(word)[0] == tokenizer.WORD
+    assert tokenizer.classify(u"a" * 60) == \
+        (tokenizer.SYMBOL, u"", u"a" * 60, u"")
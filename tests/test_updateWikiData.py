@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of updateWikiData.py against counts loaded by frequenciesToRedis.py.
+
+Redis is replaced by an in-memory database that, like Redis, stores values
+as bytes and refuses to increment values that aren't integers.
+
+"""
+
+import re
+import sys
+
+from os.path import dirname, join
+
+import pytest
+
+redis = pytest.importorskip('redis')
+pytest.importorskip('requests')  # for MediaWiki
+
+sys.path.insert(0, join(dirname(__file__), '..'))
+
+import frequenciesToRedis
+import ngrams
+import updateWikiData
+
+from redis.exceptions import ResponseError
+
+
+def _bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode('utf8')
+
+
+class FakeRedis(object):
+    """In-memory Redis database (the commands used by the scripts only)."""
+
+    def __init__(self, **kwargs):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def get(self, key):
+        return self.data.get(_bytes(key))
+
+    def set(self, key, value):
+        self.data[_bytes(key)] = _bytes(value)
+        return True
+
+    def mget(self, keys):
+        return [self.get(k) for k in keys]
+
+    def hget(self, name, key):
+        return self.data.get(_bytes(name), {}).get(_bytes(key))
+
+    def hmget(self, name, keys):
+        return [self.hget(name, k) for k in keys]
+
+    def hset(self, name, key, value):
+        fields = self.data.setdefault(_bytes(name), {})
+        created = _bytes(key) not in fields
+        fields[_bytes(key)] = _bytes(value)
+        return int(created)
+
+    def hincrby(self, name, key, amount=1):
+        fields = self.data.setdefault(_bytes(name), {})
+        value = fields.get(_bytes(key), b'0')
+        if re.match(br'-?[0-9]+\Z', value) is None:
+            raise ResponseError("hash value is not an integer")
+        fields[_bytes(key)] = _bytes(int(value) + amount)
+        return int(value) + amount
+
+    def save(self):
+        return True
+
+
+class FakePipeline(object):
+    """Pipeline of a FakeRedis: commands are buffered until execute(), but
+    run immediately between watch() and multi().
+
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+        self.immediate = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.commands = []
+
+    def watch(self, *keys):
+        self.immediate = True
+
+    def multi(self):
+        self.immediate = False
+
+    def execute(self):
+        res = [command(*args) for command, args in self.commands]
+        self.commands = []
+        return res
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+
+        def buffered(*args):
+            if self.immediate:
+                return command(*args)
+            self.commands.append((command, args))
+            return self
+        return buffered
+
+
+def load(tmpdir, monkeypatch, lines, options=()):
+    """Load frequencies with frequenciesToRedis.py into a FakeRedis.
+
+    tmpdir (py.path.local): a temporary directory.
+    monkeypatch (MonkeyPatch): the pytest fixture.
+    lines (list): the "key count" lines of the frequencies file.
+    options (tuple): the options of the script.
+
+    return (FakeRedis): the database.
+
+    """
+    path = tmpdir.join('frequencies')
+    path.write_text(u"%d 0\n" % len(lines) +
+                    u"".join(l + u"\n" for l in lines), 'utf8')
+    db = FakeRedis()
+    monkeypatch.setattr(redis, 'StrictRedis', lambda **kwargs: db)
+    monkeypatch.setattr(sys, 'argv', ['frequenciesToRedis.py', '-f',
+                                      str(path)] + list(options))
+    frequenciesToRedis.main()
+    return db
+
+
+def test_update_plain_keys(tmpdir, monkeypatch):
+    db = load(tmpdir, monkeypatch, [u"casa 1657", u"città 12"])
+    assert db.get(u"casa") == b"1657"
+    updateWikiData.update_redis_key(db, u"casa", 3)
+    updateWikiData.update_redis_key(db, u"città", -2)
+    updateWikiData.update_redis_key(db, u"nuova", 1)
+    assert db.get(u"casa") == b"1660"
+    assert db.get(u"città") == b"10"
+    assert db.get(u"nuova") == b"1"
+
+
+def test_update_buckets(tmpdir, monkeypatch):
+    db = load(tmpdir, monkeypatch, [u"la casa 1657", u"la città 12"],
+              ['--buckets', '4'])
+    updateWikiData.update_redis_key(db, u"la casa", 3, 4)
+    updateWikiData.update_redis_key(db, u"la città", -2, 4)
+    assert db.hget(ngrams.bucket(u"la casa", 4), u"la casa") == b"1660"
+    assert db.hget(ngrams.bucket(u"la città", 4), u"la città") == b"10"
+
+
+def test_add_deltas(tmpdir):
+    old = tmpdir.join('old.bigrams')
+    old.write_text(u"2 5\nla casa 3\nla città 2\n", 'utf8')
+    new = tmpdir.join('new.bigrams')
+    new.write_text(u"2 5\nla casa 4\nuna casa 1\n", 'utf8')
+    counter = updateWikiData.Counter()
+    updateWikiData.add_deltas(counter, str(old), str(new))
+    assert counter == {u"la casa": 1, u"la città": -2, u"una casa": 1}
+
+
+def test_update_word_hashes(tmpdir, monkeypatch):
+    db = load(tmpdir, monkeypatch, [u"la casa 1657", u"la città 12"],
+              ['--by-word', 'both'])
+    updateWikiData.update_word_hashes(db, u"la casa", 3, 'both')
+    updateWikiData.update_word_hashes(db, u"una casa", 1, 'both')
+    for key, count in ((u"la casa", b"1660"), (u"la città", b"12"),
+                       (u"una casa", b"1")):
+        for right in (False, True):
+            assert db.hget(*ngrams.word_hash(key, right)) == count
+
+
+def test_update_bloom(tmpdir):
+    path = str(tmpdir.join('bigrams.bloom'))
+    bloom_filter = updateWikiData.bloom.BloomFilter(10)
+    bloom_filter.add(u"la casa")
+    bloom_filter.save(path)
+    counter = updateWikiData.Counter({u"la casa": 1, u"una casa": 2,
+                                      u"la città": -1})
+    updateWikiData.update_bloom(path, counter)
+    bloom_filter = updateWikiData.bloom.BloomFilter.load(path)
+    assert u"la casa" in bloom_filter
+    assert u"una casa" in bloom_filter
+    assert len(bloom_filter) == 2
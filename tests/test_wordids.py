@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Spell corrector - http://www.chiodini.org/
+# Copyright © 2015 Luca Chiodini <luca@chiodini.org>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of the version check of stores of packed bigram keys."""
+
+import sys
+
+from os.path import dirname, join
+
+import pytest
+
+sys.path.insert(0, join(dirname(__file__), '..', 'appengine'))
+
+import wordids
+
+IDS = {u"la": 0, u"casa": 1, u"è": 2, u"bella": 3}
+
+
+class DictStore(object):
+    """Store (see ngrams) backed by a dictionary."""
+
+    def __init__(self, counts):
+        self.counts = counts
+
+    def mget(self, keys, stats=None):
+        return [self.counts.get(k) for k in keys]
+
+
+def test_check_version():
+    store = DictStore({wordids.VERSION_KEY: str(wordids.version(IDS))})
+    wordids.check_version(store, IDS)
+    with pytest.raises(ValueError):
+        wordids.check_version(store, dict(IDS, città=4))
+
+
+def test_check_version_missing():
+    # A store of plain keys: every packed key would be missed.
+    store = DictStore({u"la casa": 1657})
+    with pytest.raises(ValueError):
+        wordids.check_version(store, IDS)
+    wordids.check_version(store, IDS, required=False)
@@ -24,14 +24,24 @@ import os
 import random
 import redis
 import string
+import sys
 import tempfile
 import time
 
 from collections import Counter
 from datetime import datetime
+from os.path import dirname, join
 from subprocess import call
 
 from MediaWiki import MediaWiki
+from redis.exceptions import WatchError
+
+# The key encodings are shared with the API, which lives in appengine/.
+sys.path.insert(0, join(dirname(__file__), 'appengine'))
+
+import bloom
+import ngrams
+import wordids
 
 REDIS_UNIGRAMS_DB = 0
 REDIS_BIGRAMS_DB = 1
@@ -39,7 +49,7 @@ URL = 'http://it.wikipedia.org/'
 logger = logging.getLogger()
 
 
-def update_redis_key(redis, key, delta):
+def update_redis_key(redis, key, delta, buckets=0):
     """Update redis instance values.
 
     In details, add 'delta' to the current value of the key 'key'.
@@ -49,8 +59,15 @@ def update_redis_key(redis, key, delta):
         instance.
     key (string): the name of the key that has to be updated.
     delta (int): the value to be added to 'key'.
+    buckets (int): if positive, the number of hashes the keys were loaded
+        into (see frequenciesToRedis.py --buckets).
 
     """
+    if buckets > 0:
+        # HINCRBY is atomic, no transaction needed.
+        redis.hincrby(ngrams.bucket(key, buckets), key, delta)
+        return
+
     # Redis transaction.
     with redis.pipeline() as pipe:
         while 1:
@@ -68,6 +85,69 @@ def update_redis_key(redis, key, delta):
                 continue
 
 
+def update_word_hashes(redis, key, delta, layout):
+    """Update a bigram stored in the per-word hashes (see
+    frequenciesToRedis.py --by-word).
+
+    redis (redis.client.StrictRedis): an established connection to a Redis
+        instance.
+    key (string): the bigram that has to be updated.
+    delta (int): the value to be added to 'key'.
+    layout (string): the layouts loaded, 'left', 'right' or 'both'.
+
+    """
+    # Both hashes are updated in the same transaction, so that they never
+    # disagree.
+    with redis.pipeline() as pipe:
+        if layout in ('left', 'both'):
+            name, field = ngrams.word_hash(key)
+            pipe.hincrby(name, field, delta)
+        if layout in ('right', 'both'):
+            name, field = ngrams.word_hash(key, True)
+            pipe.hincrby(name, field, delta)
+        pipe.execute()
+
+
+def add_deltas(counter, old_path, new_path):
+    """Add to counter the changes of the counts between two frequencies
+    files.
+
+    counter (Counter): the deltas, keyed by n-gram.
+    old_path (string): the frequencies of the old revisions.
+    new_path (string): the frequencies of the new revisions.
+
+    """
+    for path, sign in ((old_path, -1), (new_path, 1)):
+        with codecs.open(path, 'r', 'utf8') as f:
+            lines = 0
+            for line in f:
+                if lines > 0:  # skip first line (which is the header)
+                    vals = line.rsplit(' ', 1)
+                    # Subtract old values, add new ones.
+                    counter[vals[0]] += sign * int(vals[1])
+                lines += 1
+
+
+def update_bloom(path, counter):
+    """Add the bigrams that got more occurrences to a Bloom filter of the
+    stored bigrams (see frequenciesToRedis.py --bloom), which would rule
+    them out otherwise. Its false positive rate grows with the keys added
+    beyond its capacity: rebuild it from time to time.
+
+    path (string): the path of the filter, rewritten in place.
+    counter (Counter): the deltas, keyed by bigram.
+
+    """
+    bloom_filter = bloom.BloomFilter.load(path)
+    for key, delta in counter.items():
+        if delta > 0 and key not in bloom_filter:
+            bloom_filter.add(key)
+    # Write a new file and rename it, so that the filter is never seen half
+    # written.
+    bloom_filter.save(path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
 def execute():
     """Execute a cycle of the program.
 
@@ -86,6 +166,12 @@ def execute():
     last_id = 0
     redis_host = "127.0.0.1"
     redis_password = None
+    unigrams_buckets = 0
+    bigrams_buckets = 0
+    bigrams_by_word = None
+    split_elisions = False
+    word_ids_file = None
+    bigrams_bloom_file = None
     try:
         with open('updateWikiData.conf', 'r') as conf_file:
             conf = json.loads(conf_file.read())
@@ -93,6 +179,12 @@ def execute():
             last_id = conf['last_id']
             redis_host = conf['redis_host']
             redis_password = conf['redis_password']
+            unigrams_buckets = conf.get('unigrams_buckets', 0)
+            bigrams_buckets = conf.get('bigrams_buckets', 0)
+            bigrams_by_word = conf.get('bigrams_by_word')
+            split_elisions = conf.get('split_elisions', False)
+            word_ids_file = conf.get('word_ids_file')
+            bigrams_bloom_file = conf.get('bigrams_bloom_file')
     except FileNotFoundError:
         logger.warning("No config file found. Using default values.")
     except (KeyError, ValueError):
@@ -187,17 +279,18 @@ def execute():
           path + "/new.xml", ""])
 
     # Execute computeFrequencies to get {old, new}.{unigrams, bigrams}
-    # frequencies.
+    # frequencies, splitting elided words as the stored counts were.
     # TODO Catch exceptions.
 
+    options = ["--split-elisions"] if split_elisions else []
     call(["./computeFrequencies.py", "-tunigrams",
-          "-f" + path + "/old.raw", "-o" + path + "/old.unigrams"])
+          "-f" + path + "/old.raw", "-o" + path + "/old.unigrams"] + options)
     call(["./computeFrequencies.py", "-tunigrams",
-          "-f" + path + "/new.raw", "-o" + path + "/new.unigrams"])
+          "-f" + path + "/new.raw", "-o" + path + "/new.unigrams"] + options)
     call(["./computeFrequencies.py", "-tbigrams",
-          "-f" + path + "/old.raw", "-o" + path + "/old.bigrams"])
+          "-f" + path + "/old.raw", "-o" + path + "/old.bigrams"] + options)
     call(["./computeFrequencies.py", "-tbigrams",
-          "-f" + path + "/new.raw", "-o" + path + "/new.bigrams"])
+          "-f" + path + "/new.raw", "-o" + path + "/new.bigrams"] + options)
 
     # Compute delta frequencies between {old, new}.unigrams and store them in a
     # python Counter.
@@ -206,23 +299,7 @@ def execute():
                                   db=REDIS_UNIGRAMS_DB,
                                   password=redis_password)
     uni_counter = Counter()
-
-    with codecs.open(path + '/old.unigrams', 'r', 'utf8') as f:
-        lines = 0
-        for line in f:
-            if lines > 0:  # skip first line (which is the header)
-                vals = line.rsplit(' ', 1)
-                # Subtract old values.
-                uni_counter[vals[0]] -= int(vals[1])
-            lines += 1
-    with codecs.open(path + '/new.unigrams', 'r', 'utf8') as f:
-        lines = 0
-        for line in f:
-            if lines > 0:  # skip first line (which is the header)
-                vals = line.rsplit(' ', 1)
-                # Add new values.
-                uni_counter[vals[0]] += int(vals[1])
-            lines += 1
+    add_deltas(uni_counter, path + '/old.unigrams', path + '/new.unigrams')
 
     # Compute delta frequencies between {old, new}.bigrams and store them in a
     # python Counter.
@@ -231,34 +308,38 @@ def execute():
                                  db=REDIS_BIGRAMS_DB, password=redis_password)
     bi_counter = Counter()
 
-    with codecs.open(path + '/old.bigrams', 'r', 'utf8') as f:
-        lines = 0
-        for line in f:
-            if lines > 0:  # skip first line (which is the header)
-                vals = line.rsplit(' ', 1)
-                # Subtract old values.
-                uni_counter[vals[0]] -= int(vals[1])
-            lines += 1
-    with codecs.open(path + '/new.bigrams', 'r', 'utf8') as f:
-        lines = 0
-        for line in f:
-            if lines > 0:  # skip first line (which is the header)
-                vals = line.rsplit(' ', 1)
-                # Add new values.
-                uni_counter[vals[0]] += int(vals[1])
-            lines += 1
+    # Bigrams loaded with frequenciesToRedis.py --ids are updated under their
+    # packed keys, which are only valid with the ids they were written with.
+    ids = None
+    if word_ids_file is not None:
+        ids = wordids.load(word_ids_file)
+        if bigrams_buckets > 0:
+            wordids.check_version(ngrams.HashStore(bi_redis, bigrams_buckets),
+                                  ids)
+        else:
+            wordids.check_version(ngrams.RedisStore(bi_redis), ids)
+
+    add_deltas(bi_counter, path + '/old.bigrams', path + '/new.bigrams')
+    if bigrams_bloom_file is not None:
+        update_bloom(bigrams_bloom_file, bi_counter)
 
     # Send unigrams data to redis.
     for key, delta in uni_counter.items():
         # Skip trivial items.
         if delta != 0:
-            update_redis_key(uni_redis, key, delta)
+            update_redis_key(uni_redis, key, delta, unigrams_buckets)
 
     # Send bigrams data to redis
     for key, delta in bi_counter.items():
         # Skip trivial items.
         if delta != 0:
-            update_redis_key(bi_redis, key, delta)
+            if ids is not None:
+                # Keep the plain key if a word has no id.
+                key = wordids.encode_key(key, ids) or key
+            if bigrams_by_word is not None:
+                update_word_hashes(bi_redis, key, delta, bigrams_by_word)
+            else:
+                update_redis_key(bi_redis, key, delta, bigrams_buckets)
 
     # Cleanup temporary data.
     temp_env.cleanup()
@@ -268,7 +349,13 @@ def execute():
         conf = {'start_from': new_start_from.strftime('%Y%m%d%H%M%S'),
                 'last_id': new_last_id,
                 'redis_host': redis_host,
-                'redis_password': redis_password}
+                'redis_password': redis_password,
+                'unigrams_buckets': unigrams_buckets,
+                'bigrams_buckets': bigrams_buckets,
+                'bigrams_by_word': bigrams_by_word,
+                'split_elisions': split_elisions,
+                'word_ids_file': word_ids_file,
+                'bigrams_bloom_file': bigrams_bloom_file}
         conf_file.write(json.dumps(conf))
 
 